@@ -0,0 +1,149 @@
+import sys
+from pathlib import Path
+
+project_root = str(Path(__file__).parent.parent.absolute())
+sys.path.append(project_root)
+
+import os
+import json
+import time
+import argparse
+from contextlib import nullcontext
+
+
+def iter_jsonl(lines):
+    """逐行解析 JSONL，每行为 {"question": ...}，可带 "id"；也接受纯字符串
+
+    返回 (记录, 错误信息) 二元组，解析失败的行记录为 None。
+    """
+    for line_no, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield None, {"line": line_no, "error": "无效的JSON格式"}
+            continue
+        if isinstance(record, str):
+            record = {"question": record}
+        question = (record.get("question") or record.get("message")) if isinstance(record, dict) else None
+        if not question:
+            yield None, {"line": line_no, "error": "问题不能为空"}
+            continue
+        if not isinstance(question, str):
+            yield None, {"line": line_no, "error": "问题必须是字符串"}
+            continue
+        yield {"id": record.get("id", line_no), "question": question}, None
+
+
+def route_batch(classifier, retriever, records, top_k=5, apply_post_processing=True, deadline=None):
+    """对一批问题做向量化分类和一次多查询检索，返回结果列表"""
+    questions = [r["question"] for r in records]
+    logits = classifier.predict_logits(questions, deadline=deadline)
+    if hasattr(logits, "tolist"):
+        logits = logits.tolist()
+    hits = retriever.retrieve_many(questions, top_k, deadline=deadline)
+
+    results = []
+    for record, row, row_hits in zip(records, logits, hits):
+        route = max(range(len(row)), key=row.__getitem__)
+        if apply_post_processing:
+            route = classifier._apply_post_processing(record["question"], route)
+        results.append({
+            "id": record["id"],
+            "question": record["question"],
+            "route": route,
+            "route_label": "需要检索" if route == 1 else "直接生成",
+            "logits": row,
+            "retrieved": [{"sentence": s, "score": score} for s, score in row_hits],
+        })
+    return results
+
+
+def route_jsonl(classifier, retriever, lines, batch_size=256, top_k=5, chunk_guard=None):
+    """流式处理 JSONL 输入，逐行产出 JSONL 结果，最后一行为吞吐量统计
+
+    某一批处理失败时输出一行包含该批 id 的错误信息，继续处理后续批次。
+    chunk_guard 为可选的上下文管理器工厂，包住每一批的处理（如准入控制），
+    进入时返回该批的截止时间或 None。
+    """
+    chunk_guard = chunk_guard or nullcontext
+    start = time.perf_counter()
+    count = 0
+    failed = 0
+    pending = []
+
+    def flush():
+        nonlocal count, failed
+        try:
+            with chunk_guard() as deadline:
+                results = route_batch(classifier, retriever, pending, top_k, deadline=deadline)
+        except Exception as e:
+            failed += len(pending)
+            error = {"ids": [r["id"] for r in pending], "error": str(e) or type(e).__name__}
+            return [json.dumps(error, ensure_ascii=False) + "\n"]
+        count += len(results)
+        return [json.dumps(result, ensure_ascii=False) + "\n" for result in results]
+
+    for record, error in iter_jsonl(lines):
+        if error is not None:
+            yield json.dumps(error, ensure_ascii=False) + "\n"
+            continue
+        pending.append(record)
+        if len(pending) >= batch_size:
+            yield from flush()
+            pending = []
+    if pending:
+        yield from flush()
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        "count": count,
+        "failed": failed,
+        "seconds": round(elapsed, 3),
+        "questions_per_sec": round(count / elapsed, 2) if elapsed > 0 else None,
+    }
+    yield json.dumps({"summary": summary}, ensure_ascii=False) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线批量路由：读取 JSONL 问题，输出分类与检索结果")
+    parser.add_argument("input", help="输入 JSONL 文件路径，- 表示标准输入")
+    parser.add_argument("-o", "--output", default="-", help="输出 JSONL 文件路径，默认标准输出")
+    parser.add_argument("--batch-size", type=int, default=256, help="每批处理的问题数")
+    parser.add_argument("--top-k", type=int, default=5, help="每个问题检索的句子数")
+    parser.add_argument("--socket", default=os.environ.get("INFERENCE_SOCKET", ""),
+                        help="推理服务的 Unix 域套接字路径，不设置则在本进程加载模型")
+    args = parser.parse_args()
+
+    if args.socket:
+        from utils.Inference.client import InferenceClient
+        classifier = retriever = InferenceClient(args.socket, timeout=600)
+    else:
+        from model_loader import init_model
+        classifier, retriever = init_model()
+        if classifier is None or not hasattr(retriever, "retrieve_many"):
+            print("❌ 模型初始化失败", file=sys.stderr)
+            exit(1)
+
+    source = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+    target = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        for line in route_jsonl(classifier, retriever, source, args.batch_size, args.top_k):
+            target.write(line)
+        # 最后一行为吞吐量统计
+        summary = json.loads(line)["summary"]
+        print(f"✅ 共处理 {summary['count']} 个问题，用时 {summary['seconds']} 秒，"
+              f"{summary['questions_per_sec']} 问题/秒", file=sys.stderr)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+
+
+if __name__ == '__main__':
+    main()
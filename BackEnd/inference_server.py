@@ -0,0 +1,43 @@
+import sys
+from pathlib import Path
+
+project_root = str(Path(__file__).parent.parent.absolute())
+sys.path.append(project_root)
+
+import os
+import argparse
+from utils.Inference.server import InferenceServer
+from utils.Retriever.retriever import RAGRetriever
+from utils.Trainer.retrainer import HotSwapClassifier, Retrainer
+from model_loader import init_model, create_registry, create_label_store, base_model_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模型推理服务，供多个 Web 进程共享同一份模型")
+    parser.add_argument("--socket", default=os.environ.get("INFERENCE_SOCKET", "/tmp/intellichat-inference.sock"),
+                        help="Unix 域套接字路径")
+    parser.add_argument("--max-batch", type=int, default=32, help="单个批次的最大条目数")
+    parser.add_argument("--max-wait-ms", type=int, default=5, help="凑批次的最长等待时间（毫秒）")
+    args = parser.parse_args()
+
+    # 初始化模型
+    classifier, retriever = init_model()
+    if classifier is None or not isinstance(retriever, RAGRetriever):
+        print("❌ 模型初始化失败，无法启动推理服务")
+        exit(1)
+
+    # 包装为可在线替换的分类器，由推理服务负责后台重训练与切换
+    registry = create_registry()
+    classifier = HotSwapClassifier(classifier, version=registry.current)
+    retrainer = Retrainer(classifier, registry, create_label_store(), str(base_model_path))
+
+    server = InferenceServer(classifier, retriever, args.socket, max_batch=args.max_batch,
+                             max_wait_ms=args.max_wait_ms, retrainer=retrainer)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("推理服务已停止")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+import os
+import shutil
+from pathlib import Path
+from utils.Trainer.label_store import LabelStore
+from utils.Trainer.registry import ModelRegistry, INITIAL_VERSION
+from dataset import questions, labels
+
+# 获取项目根目录
+project_root = Path(__file__).parent.parent
+
+# 设置模型路径
+models_dir = project_root / "utils" / "Classifier" / "models"
+base_model_path = models_dir / "bert-base-chinese"
+trained_model_path = models_dir / "trained_model"
+versions_dir = models_dir / "versions"
+
+# 用户纠正等累积的标注数据
+labels_path = project_root / "data" / "labels.jsonl"
+
+
+def create_registry():
+    """模型版本记录，初始版本为 trained_model"""
+    return ModelRegistry(str(versions_dir), initial_path=str(trained_model_path))
+
+
+def create_label_store():
+    """数据集 + 用户纠正的标注数据"""
+    return LabelStore(str(labels_path), questions, labels)
+
+
+def init_model():
+    # 模型相关依赖（torch、transformers、faiss）只在加载模型时导入，
+    # 只使用标注数据和版本记录的 Web 进程不需要它们
+    from utils.Classifier.classifier import TextClassifier
+    from utils.Classifier.data_utils import DataAugmenter
+    from utils.Retriever.retriever import create_rag_retriever
+
+    # 确保models目录存在
+    models_dir.mkdir(parents=True, exist_ok=True)
+
+    # 优先加载后台训练产出的当前版本
+    classifier = None
+    registry = create_registry()
+    if registry.current != INITIAL_VERSION:
+        classifier = TextClassifier(model_path=registry.current_path(), num_labels=2)
+        if classifier.load_model():
+            print(f"✅ 成功加载模型版本 {registry.current}")
+        else:
+            classifier = None
+
+    # 检查是否已有训练好的模型
+    if classifier is None and trained_model_path.exists():
+        # 验证训练好的模型是否完整
+        required_files = ['config.json', 'model.safetensors', 'vocab.txt']
+        if all((trained_model_path / f).exists() for f in required_files):
+            print("✅ 加载已训练好的模型")
+            classifier = TextClassifier(model_path=str(trained_model_path), num_labels=2)
+            if classifier.load_model():
+                print("✅ 成功加载训练好的模型")
+            else:
+                print("❌ 训练模型加载失败，尝试重新训练...")
+                return init_model()  # 递归调用重新初始化
+        else:
+            print("❌ 训练好的模型不完整，重新训练...")
+            shutil.rmtree(trained_model_path, ignore_errors=True)
+            return init_model()
+    elif classifier is None:
+        # 首次运行， 加载基础模型
+        print("🔄 首次运行，加载基础BERT模型并训练...")
+        if not base_model_path.exists():
+            print(f"❌ 基础模型不存在于 {base_model_path}")
+            return None, None
+            
+        classifier = TextClassifier(model_path=str(base_model_path), num_labels=2)
+        if not classifier.load_model():
+            return None, None
+        
+        # 进行训练
+        print("🔧 开始训练模型...")
+        augmenter = DataAugmenter()
+        if not classifier.train(questions, labels, batch_size=4, epochs=5, augmenter=augmenter):
+            return None, None
+        
+        # 保存训练好的模型
+        print("💾 保存训练好的模型...")
+        os.makedirs(trained_model_path, exist_ok=True)
+        classifier.save_model(save_path=str(trained_model_path))
+        
+        # 验证保存结果
+        if not all((trained_model_path / f).exists() for f in ['config.json', 'model.safetensors', 'vocab.txt']):
+            print("❌ 模型保存不完整，请检查磁盘空间或权限")
+            return None, None
+    
+    # 初始化RAG检索器
+    docx_file = project_root / "input.docx"
+    if not docx_file.exists():
+        print(f"❌ RAG文档不存在: {docx_file}")
+        return None, None
+        
+    retrieve_answer = create_rag_retriever(str(docx_file))
+    
+    return classifier, retrieve_answer
@@ -1,20 +1,34 @@
 import sys
 from pathlib import Path
-import shutil
 
 project_root = str(Path(__file__).parent.parent.absolute())
 sys.path.append(project_root)
 
 import os
 import datetime
-from flask import Flask, request, jsonify
+from contextlib import ExitStack, contextmanager
+from urllib.parse import unquote
+from flask import Flask, Request, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-from utils.Classifier.classifier import TextClassifier
-from utils.Classifier.data_utils import DataAugmenter
-from utils.Retriever.retriever import create_rag_retriever
-from dataset import questions, labels
+from utils.Admission.controller import (
+    AdmissionController, AnswerCache, Overloaded, NORMAL, NARROW_RECALL, KEYWORD_ROUTING, CACHED_ONLY,
+)
+from utils.Admission.deadline import Deadline, DeadlineExceeded
+from utils.Inference.client import InferenceClient, InferenceError, RemoteRetrainer
+from utils.Uploader.storage import UploadStore, UploadTooLargeError, EmptyUploadError
+from model_loader import create_label_store
+from batch_route import route_jsonl
+
+
+class UploadRequest(Request):
+    """multipart 中的文件直接流式写入上传存储的临时文件，同时计算摘要"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return upload_store.open_spool()
+
 
 app = Flask(__name__)
+app.request_class = UploadRequest
 
 CORS(app, resources={
     r"/api/*": {
@@ -34,72 +48,99 @@ if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
+# 上传大小限制（字节），可通过环境变量配置
+MAX_UPLOAD_SIZE = int(os.environ.get('MAX_UPLOAD_SIZE', 50 * 1024 * 1024))
+# 整个请求体的上限，为 multipart 表单头部预留少量余量
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_SIZE + 64 * 1024
+upload_store = UploadStore(UPLOAD_FOLDER, max_file_size=MAX_UPLOAD_SIZE)
 
-def init_model():
-    # 获取项目根目录
-    project_root = Path(__file__).parent.parent
-    
-    # 设置模型路径
-    models_dir = project_root / "utils" / "Classifier" / "models"
-    base_model_path = models_dir / "bert-base-chinese"
-    trained_model_path = models_dir / "trained_model"
-    
-    # 确保models目录存在
-    models_dir.mkdir(parents=True, exist_ok=True)
-
-    # 检查是否已有训练好的模型
-    if trained_model_path.exists():
-        # 验证训练好的模型是否完整
-        required_files = ['config.json', 'model.safetensors', 'vocab.txt']
-        if all((trained_model_path / f).exists() for f in required_files):
-            print("✅ 加载已训练好的模型")
-            classifier = TextClassifier(model_path=str(trained_model_path), num_labels=2)
-            if classifier.load_model():
-                print("✅ 成功加载训练好的模型")
-            else:
-                print("❌ 训练模型加载失败，尝试重新训练...")
-                return init_model()  # 递归调用重新初始化
-        else:
-            print("❌ 训练好的模型不完整，重新训练...")
-            shutil.rmtree(trained_model_path, ignore_errors=True)
-            return init_model()
+# 设置后通过推理服务（BackEnd/inference_server.py）调用模型，进程内不再加载模型
+INFERENCE_SOCKET = os.environ.get('INFERENCE_SOCKET', '')
+INFERENCE_TIMEOUT = float(os.environ.get('INFERENCE_TIMEOUT', 10))
+
+# 准入控制：并发数、排队数、单请求截止时间（秒）
+CHAT_DEADLINE = float(os.environ.get('CHAT_DEADLINE', 10))
+NARROW_TOP_K = 2
+admission = AdmissionController(
+    max_concurrent=int(os.environ.get('MAX_CONCURRENT_CHATS', 4)),
+    max_queue=int(os.environ.get('MAX_CHAT_QUEUE', 16)),
+    queue_timeout=float(os.environ.get('CHAT_QUEUE_TIMEOUT', 2)),
+)
+answer_cache = AnswerCache(maxsize=1000)
+
+# 批量路由：同时只运行少量批量任务，每批不超过推理服务的批大小，
+# 并逐批占用对话的准入名额，避免挤占交互请求
+MAX_CONCURRENT_BATCHES = int(os.environ.get('MAX_CONCURRENT_BATCHES', 1))
+BATCH_CHUNK_SIZE = 32
+BATCH_MAX_TOP_K = 20
+batch_admission = AdmissionController(max_concurrent=MAX_CONCURRENT_BATCHES, max_queue=0)
+
+# 标注数据（数据集 + 用户纠正）与后台重训练；使用推理服务时由其负责训练与切换，
+# 纠正记录通过同一个 labels.jsonl 共享
+label_store = create_label_store()
+
+
+def init_services():
+    """按运行模式创建 (classifier, retriever, retrieve_answer, retrainer)
+
+    在模块导入时执行，gunicorn 等多 worker 部署下每个 worker 各自初始化。
+    使用推理服务时只创建客户端，Web 进程不加载 torch 等模型依赖。
+    """
+    if INFERENCE_SOCKET:
+        # 连接共享的推理服务，连接在首次调用时建立
+        client = InferenceClient(INFERENCE_SOCKET, timeout=INFERENCE_TIMEOUT)
+        return client, client, client.retrieve, RemoteRetrainer(client)
+
+    # 进程内加载模型
+    from model_loader import init_model, create_registry, base_model_path
+    from utils.Trainer.retrainer import HotSwapClassifier, Retrainer
+
+    classifier, retrieve_answer = init_model()
+    if classifier is None or retrieve_answer is None:
+        print("❌ 模型初始化失败，无法启动服务")
+        sys.exit(1)
+
+    # 包装为可在线替换的分类器，启用后台重训练
+    registry = create_registry()
+    classifier = HotSwapClassifier(classifier, version=registry.current)
+    retrainer = Retrainer(classifier, registry, label_store, str(base_model_path))
+    return classifier, retrieve_answer, retrieve_answer, retrainer
+
+
+classifier, retriever, retrieve_answer, retrainer = init_services()
+
+
+def answer_chat(user_message, level, deadline):
+    """按降级级别生成回答"""
+    if level >= CACHED_ONLY:
+        # 压力最高时只返回缓存的答案
+        cached = answer_cache.get(user_message)
+        if cached is None:
+            admission.record("shed_cache_miss")
+            raise Overloaded("服务繁忙，请稍后重试", status=503, retry_after=admission.retry_after)
+        return cached
+
+    ai_response = ""
+    ai_response += f"您刚才说的是{user_message}\n"
+
+    questions = [user_message]
+    if level >= KEYWORD_ROUTING:
+        # 跳过 BERT，只按关键词规则路由
+        predictions = [classifier._apply_post_processing(q, 0) for q in questions]
     else:
-        # 首次运行， 加载基础模型
-        print("🔄 首次运行，加载基础BERT模型并训练...")
-        if not base_model_path.exists():
-            print(f"❌ 基础模型不存在于 {base_model_path}")
-            return None, None
-            
-        classifier = TextClassifier(model_path=str(base_model_path), num_labels=2)
-        if not classifier.load_model():
-            return None, None
-        
-        # 进行训练
-        print("🔧 开始训练模型...")
-        augmenter = DataAugmenter()
-        if not classifier.train(questions, labels, batch_size=4, epochs=5, augmenter=augmenter):
-            return None, None
-        
-        # 保存训练好的模型
-        print("💾 保存训练好的模型...")
-        os.makedirs(trained_model_path, exist_ok=True)
-        classifier.save_model(save_path=str(trained_model_path))
-        
-        # 验证保存结果
-        if not all((trained_model_path / f).exists() for f in ['config.json', 'model.safetensors', 'vocab.txt']):
-            print("❌ 模型保存不完整，请检查磁盘空间或权限")
-            return None, None
-    
-    # 初始化RAG检索器
-    docx_file = project_root / "input.docx"
-    if not docx_file.exists():
-        print(f"❌ RAG文档不存在: {docx_file}")
-        return None, None
-        
-    retrieve_answer = create_rag_retriever(str(docx_file))
-    
-    return classifier, retrieve_answer
-    
+        predictions = classifier.predict(questions, deadline=deadline)
+    for q, pred in zip(questions, predictions):
+        ai_response += f"预测: {'需要检索' if pred == 1 else '直接生成'}\n"
+        ai_response += "-"*50
+
+    top_k = NARROW_TOP_K if level >= NARROW_RECALL else 5
+    predictions2 = retrieve_answer(user_message, top_k=top_k, deadline=deadline)
+    ai_response += f"{predictions2}"
+
+    # 只缓存完整流程的答案，避免降级结果覆盖后在 CACHED_ONLY 级别被返回
+    if level == NORMAL:
+        answer_cache.put(user_message, ai_response)
+    return ai_response
 
 @app.route('/api/chat', methods=['POST', 'OPTIONS'])
 def handle_chat():
@@ -126,17 +167,18 @@ def handle_chat():
             if not user_message:
                 return jsonify({"error": "消息不能为空"}), 400
         
-        ai_response = ""
-        ai_response += f"您刚才说的是{user_message}\n"
-
-        questions = [user_message]
-        predictions = classifier.predict(questions)
-        for q, pred in zip(questions, predictions):
-                ai_response += f"预测: {'需要检索' if pred == 1 else '直接生成'}\n"
-                ai_response += "-"*50
-
-        predictions2 = retrieve_answer(user_message)
-        ai_response += f"{predictions2}"
+        deadline = Deadline(CHAT_DEADLINE)
+        try:
+            with admission.admit(deadline) as level:
+                ai_response = answer_chat(user_message, level, deadline)
+        except Overloaded as e:
+            return jsonify({"error": str(e)}), e.status, {"Retry-After": str(e.retry_after)}
+        except DeadlineExceeded as e:
+            admission.record("deadline_exceeded")
+            return jsonify({"error": str(e)}), 503, {"Retry-After": str(admission.retry_after)}
+        except InferenceError as e:
+            admission.record("inference_unavailable")
+            return jsonify({"error": str(e)}), 503, {"Retry-After": str(admission.retry_after)}
         
         # 记录对话历史
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -158,41 +200,165 @@ def handle_chat():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/chat/batch', methods=['POST'])
+def handle_chat_batch():
+    """批量路由：请求体为 JSONL（每行 {"question": ...}），流式返回 JSONL 结果
+
+    不写入对话历史，最后一行为吞吐量统计。批量任务数超限返回 429，
+    对话已进入降级时返回 503；每批经过对话准入控制并带截止时间。
+    """
+    if admission.level() > NORMAL:
+        admission.record("shed_batch")
+        return jsonify({"error": "服务繁忙，请稍后重试"}), 503, {"Retry-After": str(admission.retry_after)}
+
+    # 名额在整个流式响应期间保持占用，响应关闭时释放（包括响应未被迭代就关闭的情况）
+    stack = ExitStack()
+    try:
+        stack.enter_context(batch_admission.admit())
+    except Overloaded as e:
+        admission.record("shed_batch")
+        return jsonify({"error": "已有批量任务在运行，请稍后重试"}), e.status, {"Retry-After": str(e.retry_after)}
+
+    try:
+        batch_size = max(1, min(request.args.get('batch_size', BATCH_CHUNK_SIZE, type=int), BATCH_CHUNK_SIZE))
+        top_k = max(1, min(request.args.get('top_k', 5, type=int), BATCH_MAX_TOP_K))
+        results = route_jsonl(classifier, retriever, request.stream, batch_size=batch_size,
+                              top_k=top_k, chunk_guard=batch_chunk_guard)
+        response = Response(stream_with_context(results), mimetype='application/x-ndjson')
+    except Exception:
+        stack.close()
+        raise
+    response.call_on_close(stack.close)
+    return response
+
+@contextmanager
+def batch_chunk_guard():
+    """每批占用一个对话准入名额；对话已进入降级时暂停批量处理"""
+    deadline = Deadline(CHAT_DEADLINE)
+    with admission.admit(deadline) as level:
+        if level > NORMAL:
+            admission.record("shed_batch_chunk")
+            raise Overloaded("服务繁忙，该批未处理", status=503, retry_after=admission.retry_after)
+        yield deadline
+
 @app.route('/api/upload', methods=['POST'])
 def handle_upload():
-    """处理文件上传"""
-    if 'file' not in request.files:
-        return jsonify({"error": "没有文件"}), 400
-    
-    file = request.files['file']
-    if file.filename == '':
-        return jsonify({"error": "未选择文件"}), 400
-    
-    if file:
-        # 保存文件
-        filename = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
-        file.save(filename)
-        
-        # 记录上传历史并返回固定消息
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        chat_history.append({
-            "type": "user",
-            "content": f"上传了文件：{file.filename}",
-            "timestamp": timestamp
-        })
-        
-        ai_response = f"文件「{file.filename}」已接收，这是固定的处理结果"
-        chat_history.append({
-            "type": "ai",
-            "content": ai_response,
-            "timestamp": timestamp
-        })
-        
-        return jsonify({
-            "response": ai_response,
-            "filename": file.filename,
-            "timestamp": timestamp
-        })
+    """处理文件上传
+
+    支持两种方式：
+    - multipart/form-data 表单中的 file 字段
+    - 请求体直接为文件内容，文件名放在 X-Filename 请求头中
+    若请求头 X-Content-SHA256 给出的摘要已存在，则不读取请求体直接返回
+    """
+    filename = unquote(request.headers.get('X-Filename', ''))
+    digest = request.headers.get('X-Content-SHA256', '').lower()
+
+    try:
+        record = upload_store.touch(digest, filename) if digest else None
+        duplicated = record is not None
+
+        if record is None:
+            if request.mimetype == 'multipart/form-data':
+                if 'file' not in request.files:
+                    return jsonify({"error": "没有文件"}), 400
+
+                file = request.files['file']
+                if file.filename == '':
+                    return jsonify({"error": "未选择文件"}), 400
+
+                filename = file.filename
+                record, duplicated = upload_store.commit(file.stream, filename)
+            else:
+                if not filename:
+                    return jsonify({"error": "未提供文件名"}), 400
+                record, duplicated = upload_store.save_stream(request.stream, filename)
+    except UploadTooLargeError as e:
+        return jsonify({"error": str(e)}), 413
+    except EmptyUploadError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # 记录上传历史并返回固定消息
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    chat_history.append({
+        "type": "user",
+        "content": f"上传了文件：{filename}",
+        "timestamp": timestamp
+    })
+
+    if duplicated:
+        ai_response = f"文件「{filename}」已存在，跳过重复处理"
+    else:
+        ai_response = f"文件「{filename}」已接收，这是固定的处理结果"
+    chat_history.append({
+        "type": "ai",
+        "content": ai_response,
+        "timestamp": timestamp
+    })
+
+    return jsonify({
+        "response": ai_response,
+        "filename": filename,
+        "digest": record["digest"],
+        "size": record["size"],
+        "duplicate": duplicated,
+        "timestamp": timestamp
+    })
+
+@app.errorhandler(413)
+def handle_too_large(e):
+    return jsonify({"error": f"文件超过大小限制 {MAX_UPLOAD_SIZE} 字节"}), 413
+
+@app.route('/api/feedback', methods=['POST'])
+def handle_feedback():
+    """记录用户对路由结果的纠正，作为后续训练数据"""
+    data = request.get_json(silent=True) or {}
+    message = data.get('message', '')
+    label = data.get('label')
+    if not isinstance(message, str) or not message:
+        return jsonify({"error": "消息必须为非空字符串"}), 400
+    if isinstance(label, bool) or label not in (0, 1):
+        return jsonify({"error": "标签必须为 0（直接生成）或 1（需要检索）"}), 400
+
+    record = label_store.add(message, label)
+    return jsonify({"message": "已记录纠正", "record": record})
+
+@app.route('/api/model/status', methods=['GET'])
+def model_status():
+    """查看当前模型版本与训练状态"""
+    if retrainer is None:
+        return jsonify({"error": "模型管理不可用"}), 503
+    return jsonify(retrainer.status())
+
+@app.route('/api/model/retrain', methods=['POST'])
+def retrain_model():
+    """在后台进程中用累积的标注数据重新训练，完成后自动切换"""
+    if retrainer is None:
+        return jsonify({"error": "模型管理不可用"}), 503
+    if not retrainer.start():
+        return jsonify({"error": "已有训练任务在进行"}), 409
+    return jsonify({"message": "已开始后台训练"}), 202
+
+@app.route('/api/model/rollback', methods=['POST'])
+def rollback_model():
+    """切换回上一个模型版本"""
+    if retrainer is None:
+        return jsonify({"error": "模型管理不可用"}), 503
+    version = retrainer.rollback()
+    if version is None:
+        return jsonify({"error": "没有可回滚的版本"}), 409
+    return jsonify({"message": f"已回滚到模型版本 {version}", "version": version})
+
+@app.errorhandler(InferenceError)
+def handle_inference_error(e):
+    """推理服务不可用时返回 503，而不是 500"""
+    return jsonify({"error": str(e)}), 503
+
+@app.route('/api/admission/stats', methods=['GET'])
+def admission_stats():
+    """查看准入队列、降级级别以及拒绝/降级计数"""
+    stats = admission.stats()
+    stats["batch"] = batch_admission.stats()
+    return jsonify(stats)
 
 @app.route('/api/history', methods=['GET'])
 def get_history():
@@ -215,10 +381,8 @@ if __name__ == '__main__':
     if not os.path.exists(UPLOAD_FOLDER):
         os.makedirs(UPLOAD_FOLDER)
 
-    # 初始化模型
-    classifier, retrieve_answer = init_model()
-    if classifier is None or retrieve_answer is None:
-        print("❌ 模型初始化失败，无法启动服务")
+    if INFERENCE_SOCKET and not classifier.ping():
+        print(f"❌ 无法连接推理服务: {INFERENCE_SOCKET}")
         exit(1)
 
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,91 @@
+import io
+import sys
+import json
+from contextlib import contextmanager
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+sys.path.append(str(project_root / "BackEnd"))
+
+from batch_route import route_jsonl
+from utils.Classifier.rules import apply_keyword_rules
+
+
+class FakeClassifier:
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.batches = []
+
+    def predict_logits(self, texts, deadline=None):
+        self.batches.append(list(texts))
+        if self.fail_on in texts:
+            raise RuntimeError("推理失败")
+        return [[0.9, 0.1] for _ in texts]
+
+    def _apply_post_processing(self, text, pred):
+        return apply_keyword_rules(text, pred)
+
+
+class FakeRetriever:
+    def retrieve_many(self, questions, top_k=5, deadline=None):
+        return [[("句子。", 0.8)] for _ in questions]
+
+
+def run(lines, classifier=None, **kwargs):
+    output = route_jsonl(classifier or FakeClassifier(), FakeRetriever(), io.StringIO(lines), **kwargs)
+    return [json.loads(line) for line in output]
+
+
+def test_results_and_summary():
+    results = run('{"id": "a", "question": "北京天气"}\n"如何学习Python"\n', batch_size=1)
+
+    assert results[0]["id"] == "a"
+    assert results[0]["route"] == 1  # 关键词规则
+    assert results[0]["logits"] == [0.9, 0.1]
+    assert results[0]["retrieved"] == [{"sentence": "句子。", "score": 0.8}]
+    assert (results[1]["id"], results[1]["route"]) == (2, 0)
+    assert results[-1]["summary"]["count"] == 2
+
+
+def test_invalid_lines_get_error_lines():
+    results = run('not json\n{"question": 123}\n{"question": ["a"]}\n{"foo": 1}\n{"message": "ok"}\n')
+
+    assert [r.get("line") for r in results[:4]] == [1, 2, 3, 4]
+    assert all("error" in r for r in results[:4])
+    assert results[4]["question"] == "ok"
+    assert results[-1]["summary"]["count"] == 1
+
+
+def test_failed_chunk_does_not_end_stream():
+    classifier = FakeClassifier(fail_on="坏")
+    results = run('"好1"\n"坏"\n"好2"\n', classifier=classifier, batch_size=2)
+
+    assert results[0] == {"ids": [1, 2], "error": "推理失败"}
+    assert results[1]["question"] == "好2"
+    assert results[-1]["summary"]["count"] == 1
+    assert results[-1]["summary"]["failed"] == 2
+
+
+def test_chunk_guard_wraps_each_chunk():
+    seen = []
+
+    class DeadlineClassifier(FakeClassifier):
+        def predict_logits(self, texts, deadline=None):
+            seen.append(deadline)
+            return super().predict_logits(texts, deadline)
+
+    calls = {"n": 0}
+
+    @contextmanager
+    def guard():
+        calls["n"] += 1
+        if calls["n"] == 2:
+            raise RuntimeError("服务繁忙")
+        yield "deadline"
+
+    results = run('"a"\n"b"\n"c"\n', classifier=DeadlineClassifier(), batch_size=1, chunk_guard=guard)
+
+    assert results[1] == {"ids": [2], "error": "服务繁忙"}
+    assert [r["question"] for r in (results[0], results[2])] == ["a", "c"]
+    assert seen == ["deadline", "deadline"]
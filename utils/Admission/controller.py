@@ -0,0 +1,130 @@
+import threading
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+from utils.Classifier.token_cache import normalize_text
+
+# 降级级别，数值越大处理越简化
+NORMAL = 0
+NARROW_RECALL = 1    # 缩小检索范围，去掉宽召回
+KEYWORD_ROUTING = 2  # 只用关键词规则路由，不调用 BERT
+CACHED_ONLY = 3      # 只返回缓存的答案
+
+LEVEL_NAMES = {
+    NORMAL: "normal",
+    NARROW_RECALL: "narrow_recall",
+    KEYWORD_ROUTING: "keyword_routing",
+    CACHED_ONLY: "cached_only",
+}
+
+
+class Overloaded(Exception):
+    """请求被拒绝，status 为 HTTP 状态码，retry_after 为建议重试间隔（秒）"""
+
+    def __init__(self, message, status=503, retry_after=1):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """有界准入队列：限制并发数和排队数，按排队压力给出降级级别"""
+
+    def __init__(self, max_concurrent=4, max_queue=16, queue_timeout=2.0, retry_after=1,
+                 degrade_thresholds=(0.5, 0.75, 0.9)):
+        """初始化
+        :param max_concurrent: 同时处理的最大请求数
+        :param max_queue: 最大排队数，超出直接返回 429
+        :param queue_timeout: 最长排队时间（秒），超时返回 503
+        :param retry_after: Retry-After 响应头的秒数
+        :param degrade_thresholds: 进入各降级级别的压力阈值（占用 / 总容量）
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.degrade_thresholds = degrade_thresholds
+        self.in_flight = 0
+        self.waiting = 0
+        self.counters = Counter()
+        self._cond = threading.Condition()
+
+    def pressure(self):
+        return (self.in_flight + self.waiting) / (self.max_concurrent + self.max_queue)
+
+    def level(self):
+        pressure = self.pressure()
+        return sum(pressure >= threshold for threshold in self.degrade_thresholds)
+
+    @contextmanager
+    def admit(self, deadline=None):
+        """获取处理名额，返回当前降级级别；排队已满或等待超时抛出 Overloaded"""
+        with self._cond:
+            if self.in_flight >= self.max_concurrent:
+                if self.waiting >= self.max_queue:
+                    self.counters["shed_queue_full"] += 1
+                    raise Overloaded("服务繁忙，请稍后重试", status=429, retry_after=self.retry_after)
+
+                timeout = self.queue_timeout
+                if deadline is not None:
+                    timeout = min(timeout, deadline.remaining())
+                self.waiting += 1
+                try:
+                    admitted = self._cond.wait_for(lambda: self.in_flight < self.max_concurrent, timeout)
+                finally:
+                    self.waiting -= 1
+                if not admitted:
+                    self.counters["shed_queue_timeout"] += 1
+                    raise Overloaded("排队超时，请稍后重试", status=503, retry_after=self.retry_after)
+
+            # 排队压力在占用名额之前计算，包含仍在等待的请求
+            level = self.level()
+            self.in_flight += 1
+            self.counters["admitted"] += 1
+            if level:
+                self.counters[f"degraded_{LEVEL_NAMES[level]}"] += 1
+
+        try:
+            yield level
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+                self._cond.notify()
+
+    def record(self, name):
+        with self._cond:
+            self.counters[name] += 1
+
+    def stats(self):
+        with self._cond:
+            return {
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "level": LEVEL_NAMES[self.level()],
+                "counters": dict(self.counters),
+            }
+
+
+class AnswerCache:
+    """有界 LRU 答案缓存，最高降级级别下只从这里返回答案"""
+
+    def __init__(self, maxsize=1000):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, message):
+        key = normalize_text(message)
+        with self._lock:
+            answer = self._data.get(key)
+            if answer is not None:
+                self._data.move_to_end(key)
+            return answer
+
+    def put(self, message, answer):
+        key = normalize_text(message)
+        with self._lock:
+            self._data[key] = answer
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
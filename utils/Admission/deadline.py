@@ -0,0 +1,27 @@
+import time
+
+
+class DeadlineExceeded(Exception):
+    """请求已超过截止时间"""
+
+
+class Deadline:
+    """单个请求的截止时间，沿分类、检索各步骤传递"""
+
+    def __init__(self, timeout):
+        """初始化
+        :param timeout: 从现在起的可用时间（秒）
+        """
+        self.timeout = timeout
+        self.expires_at = time.monotonic() + timeout
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+    def check(self):
+        """已超时则抛出 DeadlineExceeded"""
+        if self.expired():
+            raise DeadlineExceeded(f"请求超过截止时间 {self.timeout} 秒")
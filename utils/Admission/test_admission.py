@@ -0,0 +1,135 @@
+import sys
+import time
+import threading
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+import pytest
+
+from utils.Admission.controller import (
+    AdmissionController, AnswerCache, Overloaded, NORMAL, NARROW_RECALL, KEYWORD_ROUTING, CACHED_ONLY,
+)
+from utils.Admission.deadline import Deadline, DeadlineExceeded
+
+
+def occupy(controller, count):
+    """占住 count 个处理名额，返回用于释放的事件和线程"""
+    release = threading.Event()
+    entered = threading.Semaphore(0)
+
+    def hold():
+        with controller.admit():
+            entered.release()
+            release.wait()
+
+    threads = [threading.Thread(target=hold) for _ in range(count)]
+    for t in threads:
+        t.start()
+    return release, threads, entered
+
+
+def wait_for(predicate, timeout=2):
+    end = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < end
+        time.sleep(0.005)
+
+
+def test_full_queue_sheds_with_429():
+    controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5, retry_after=3)
+    release, threads, _ = occupy(controller, 2)  # 一个处理中，一个排队
+    wait_for(lambda: controller.in_flight == 1 and controller.waiting == 1)
+
+    with pytest.raises(Overloaded) as excinfo:
+        with controller.admit():
+            pass
+    assert excinfo.value.status == 429
+    assert excinfo.value.retry_after == 3
+    assert controller.counters["shed_queue_full"] == 1
+
+    release.set()
+    for t in threads:
+        t.join()
+    assert controller.counters["admitted"] == 2
+
+
+def test_queue_timeout_sheds_with_503():
+    controller = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout=0.05)
+    release, threads, entered = occupy(controller, 1)
+    entered.acquire()
+
+    with pytest.raises(Overloaded) as excinfo:
+        with controller.admit():
+            pass
+    assert excinfo.value.status == 503
+    assert controller.counters["shed_queue_timeout"] == 1
+    assert controller.waiting == 0
+
+    release.set()
+    threads[0].join()
+
+
+def test_queue_wait_is_capped_by_deadline():
+    controller = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout=5)
+    release, threads, entered = occupy(controller, 1)
+    entered.acquire()
+
+    start = time.monotonic()
+    with pytest.raises(Overloaded):
+        with controller.admit(Deadline(0.05)):
+            pass
+    assert time.monotonic() - start < 1
+
+    release.set()
+    threads[0].join()
+
+
+@pytest.mark.parametrize("occupied, expected", [
+    (0, NORMAL),
+    (4, NORMAL),
+    (5, NARROW_RECALL),
+    (7, NARROW_RECALL),
+    (8, KEYWORD_ROUTING),
+    (9, CACHED_ONLY),
+])
+def test_degrade_level_thresholds(occupied, expected):
+    # 总容量 10，阈值 0.5 / 0.75 / 0.9
+    controller = AdmissionController(max_concurrent=4, max_queue=6)
+    controller.in_flight = min(occupied, 4)
+    controller.waiting = max(occupied - 4, 0)
+    assert controller.level() == expected
+
+
+def test_degraded_admissions_are_counted():
+    controller = AdmissionController(max_concurrent=2, max_queue=0, degrade_thresholds=(0.5,))
+    with controller.admit() as first:
+        with controller.admit() as second:
+            assert (first, second) == (NORMAL, NARROW_RECALL)
+    assert controller.counters["degraded_narrow_recall"] == 1
+    assert controller.stats()["in_flight"] == 0
+
+
+def test_answer_cache_lru_eviction():
+    cache = AnswerCache(maxsize=2)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get(" a ") == "A"  # a 变为最近使用，键按空白规范化
+    cache.put("c", "C")             # 淘汰 b
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.get("c") == "C"
+
+
+def test_deadline():
+    deadline = Deadline(10)
+    assert not deadline.expired()
+    assert 9 < deadline.remaining() <= 10
+    deadline.check()
+
+    expired = Deadline(0)
+    assert expired.expired()
+    assert expired.remaining() == 0
+    with pytest.raises(DeadlineExceeded):
+        expired.check()
@@ -2,19 +2,25 @@ import os
 import torch
 from torch.utils.data import DataLoader, TensorDataset
 from sklearn.model_selection import train_test_split
-from transformers import BertTokenizer, BertForSequenceClassification
+from transformers import BertTokenizerFast, BertForSequenceClassification
 import random
+from utils.Classifier.token_cache import shared_token_cache
+from utils.Classifier.rules import apply_keyword_rules
 
 class TextClassifier:
 
-    def __init__(self, model_path, num_labels=2, device=None):
+    def __init__(self, model_path, num_labels=2, device=None, batch_size=32, token_cache=None):
         """初始化
         :param model_path: 模型路径（必须参数）
+        :param batch_size: 预测时每批的文本数
+        :param token_cache: token ID 缓存，默认与检索器共享
         """
         self.model_path = model_path
         self.trained_model_path = os.path.join(os.path.dirname(__file__), "models", "trained_model")  # 默认训练后保存路径
         self.num_labels = num_labels
         self.device = device or torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.batch_size = batch_size
+        self.token_cache = shared_token_cache if token_cache is None else token_cache
         self.tokenizer = None
         self.model = None
 
@@ -28,7 +34,8 @@ class TextClassifier:
             if missing_files:
                 raise ValueError(f"模型文件缺失: {missing_files}")
 
-            self.tokenizer = BertTokenizer.from_pretrained(self.model_path)
+            # Rust 实现的快速分词器，由同一个 vocab.txt 构建
+            self.tokenizer = BertTokenizerFast.from_pretrained(self.model_path)
             self.model = BertForSequenceClassification.from_pretrained(
                 self.model_path,
                 num_labels=self.num_labels,
@@ -81,24 +88,17 @@ class TextClassifier:
         
         return True
     
-    def predict(self, texts, apply_post_processing=True):
-        """对文本进行分类预测"""
+    def predict(self, texts, apply_post_processing=True, deadline=None):
+        """对文本进行分类预测
+        :param deadline: 可选，请求截止时间，每批推理前检查
+        """
         if self.model is None or self.tokenizer is None:
             print("❌ 请先加载模型")
             return []
         
-        self.model.eval()
+        logits = self.predict_logits(texts, deadline)
         predictions = []
-        
-        for text in texts:
-            # 预处理文本
-            inputs = self.tokenizer(text, return_tensors="pt", padding=True, truncation=True).to(self.device)
-            
-            # 模型预测
-            with torch.no_grad():
-                outputs = self.model(**inputs)
-                pred = torch.argmax(outputs.logits, dim=1).item()
-            
+        for text, pred in zip(texts, torch.argmax(logits, dim=1).tolist()):
             # 后处理规则
             if apply_post_processing:
                 pred = self._apply_post_processing(text, pred)
@@ -106,6 +106,28 @@ class TextClassifier:
             predictions.append(pred)
         
         return predictions
+
+    def predict_logits(self, texts, deadline=None):
+        """批量计算分类 logits，返回形状为 (文本数, 类别数) 的张量"""
+        self.model.eval()
+        texts = list(texts)
+        if not texts:
+            return torch.empty((0, self.num_labels))
+
+        batches = []
+        for start in range(0, len(texts), self.batch_size):
+            if deadline is not None:
+                deadline.check()
+            inputs = self.encode(texts[start:start + self.batch_size])
+            with torch.no_grad():
+                batches.append(self.model(**inputs).logits.cpu())
+        return torch.cat(batches)
+
+    def encode(self, texts):
+        """通过 token ID 缓存批量编码文本，返回补齐后的模型输入"""
+        input_ids = self.token_cache.encode(self.tokenizer, texts, max_length=self.tokenizer.model_max_length)
+        inputs = self.tokenizer.pad({"input_ids": input_ids}, padding=True, return_tensors="pt")
+        return inputs.to(self.device)
     
     def save_model(self, save_path=None):
         """将模型保存到指定路径
@@ -167,7 +189,4 @@ class TextClassifier:
     
     def _apply_post_processing(self, text, pred):
         """应用后处理规则调整预测结果"""
-        # 示例规则：包含特定关键词的问题强制分类为1
-        if any(kw in text for kw in ["天气", "温度", "下雨", "气温", "最新情况", "最近", "目前"]):
-            return 1
-        return pred
+        return apply_keyword_rules(text, pred)
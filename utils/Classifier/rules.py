@@ -0,0 +1,9 @@
+# 需要检索的关键词：包含任一关键词的问题强制分类为1
+RETRIEVAL_KEYWORDS = ["天气", "温度", "下雨", "气温", "最新情况", "最近", "目前"]
+
+
+def apply_keyword_rules(text, pred):
+    """应用关键词规则调整预测结果（不依赖模型，可单独用于降级路由）"""
+    if any(kw in text for kw in RETRIEVAL_KEYWORDS):
+        return 1
+    return pred
@@ -0,0 +1,60 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from utils.Classifier.token_cache import TokenCache, normalize_text
+
+
+class CountingTokenizer:
+    """按字符编码的分词器，记录每次批量编码的输入"""
+
+    def __init__(self, name="fake"):
+        self.name_or_path = name
+        self.calls = []
+
+    def __call__(self, texts, truncation=True, max_length=512):
+        self.calls.append(list(texts))
+        return {"input_ids": [[ord(c) for c in text][:max_length] for text in texts]}
+
+
+def test_normalize_text_only_collapses_whitespace():
+    assert normalize_text("  北京 \t 天气\n") == "北京 天气"
+    assert normalize_text("Git Rebase") == "Git Rebase"
+
+
+def test_misses_are_batch_encoded_once():
+    tokenizer = CountingTokenizer()
+    cache = TokenCache(maxsize=10)
+
+    first = cache.encode(tokenizer, ["ab", "cd", " ab "])
+    assert first == [[97, 98], [99, 100], [97, 98]]
+    assert tokenizer.calls == [["ab", "cd"]]
+
+    assert cache.encode(tokenizer, ["cd", "ab"]) == [[99, 100], [97, 98]]
+    assert len(tokenizer.calls) == 1
+    assert (cache.hits, cache.misses) == (2, 3)
+
+
+def test_lru_eviction():
+    tokenizer = CountingTokenizer()
+    cache = TokenCache(maxsize=2)
+
+    cache.encode(tokenizer, ["a", "b"])
+    cache.encode(tokenizer, ["a"])  # a 变为最近使用
+    cache.encode(tokenizer, ["c"])  # 淘汰 b
+    assert len(cache) == 2
+
+    tokenizer.calls.clear()
+    cache.encode(tokenizer, ["a", "b"])
+    assert tokenizer.calls == [["b"]]
+
+
+def test_tokenizers_do_not_share_entries():
+    cache = TokenCache()
+    first, second = CountingTokenizer("first"), CountingTokenizer("second")
+
+    cache.encode(first, ["a"])
+    cache.encode(second, ["a"])
+    assert second.calls == [["a"]]
+    assert len(cache) == 2
@@ -0,0 +1,44 @@
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+sys.path.append(str(project_root / "BackEnd"))
+
+import pytest
+
+transformers = pytest.importorskip("transformers")
+
+from utils.Classifier.token_cache import TokenCache
+from dataset import questions
+
+MODEL_PATH = str(Path(__file__).parent / "models" / "trained_model")
+
+
+def test_fast_tokenizer_matches_slow():
+    """快速分词器（经缓存）与原 BertTokenizer 的 token ID 必须完全一致"""
+    slow = transformers.BertTokenizer.from_pretrained(MODEL_PATH)
+    fast = transformers.BertTokenizerFast.from_pretrained(MODEL_PATH)
+    cache = TokenCache(maxsize=len(questions))
+
+    expected = [slow(q, truncation=True)["input_ids"] for q in questions]
+    assert cache.encode(fast, questions) == expected
+    # 第二次全部命中缓存，结果不变
+    assert cache.encode(fast, questions) == expected
+    assert cache.hits == len(questions)
+
+
+def test_token_cache_is_bounded():
+    fast = transformers.BertTokenizerFast.from_pretrained(MODEL_PATH)
+    cache = TokenCache(maxsize=5)
+
+    cache.encode(fast, questions[:10])
+    assert len(cache) == 5
+    # 只合并空白，不影响 token ID
+    assert cache.encode(fast, ["  上海明天的气温是多少？ "]) == cache.encode(fast, ["上海明天的气温是多少？"])
+
+
+if __name__ == "__main__":
+    test_fast_tokenizer_matches_slow()
+    test_token_cache_is_bounded()
+    print("✅ 快速分词器与原分词器的 token ID 一致")
@@ -0,0 +1,67 @@
+import threading
+from collections import OrderedDict
+
+
+def normalize_text(text):
+    """规范化文本作为缓存键
+
+    只合并首尾及连续空白：BERT 分词本身按空白切分，因此不会改变 token ID。
+    """
+    return " ".join(text.split())
+
+
+class TokenCache:
+    """有界 LRU 缓存：规范化文本 -> token ID 列表
+
+    按分词器名称区分命名空间，分类预测和查询编码共用同一个实例与容量上限。
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def encode(self, tokenizer, texts, max_length=512):
+        """批量获取 token ID，未命中的文本一次性批量编码后写入缓存"""
+        namespace = tokenizer.name_or_path
+        keys = [(namespace, normalize_text(text)) for text in texts]
+        results = [None] * len(keys)
+        missing = {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                ids = self._data.get(key)
+                if ids is None:
+                    missing.setdefault(key, []).append(i)
+                else:
+                    self._data.move_to_end(key)
+                    results[i] = ids
+            self.hits += len(keys) - sum(len(v) for v in missing.values())
+            self.misses += sum(len(v) for v in missing.values())
+
+        if missing:
+            encoded = tokenizer([text for _, text in missing], truncation=True, max_length=max_length)["input_ids"]
+            with self._lock:
+                for key, ids in zip(missing, encoded):
+                    for i in missing[key]:
+                        results[i] = ids
+                    self._data[key] = ids
+                    self._data.move_to_end(key)
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+
+        return results
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+
+# 分类器与检索器共享的默认缓存
+shared_token_cache = TokenCache()
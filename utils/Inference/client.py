@@ -0,0 +1,168 @@
+import queue
+import socket
+import threading
+
+from utils.Admission.deadline import DeadlineExceeded
+from utils.Classifier.rules import apply_keyword_rules
+from utils.Inference.protocol import (
+    OP_CLASSIFY, OP_EMBED, OP_SEARCH, OP_PING, OP_ADMIN, STATUS_OK, STATUS_DEADLINE,
+    ProtocolError, send_frame, recv_frame, encode_json, decode_json, decode_matrix,
+)
+
+
+class InferenceError(Exception):
+    """推理服务不可用、超时或返回错误"""
+
+
+class InferenceClient:
+    """推理服务客户端，维护一组到 Unix 域套接字的复用连接
+
+    predict/retrieve 与 TextClassifier、检索函数的调用方式保持一致，
+    可以直接替换进程内的模型使用。各方法的 deadline 为可选的请求截止时间，
+    会限制本次调用的超时并随请求传给推理服务。
+    """
+
+    def __init__(self, socket_path, pool_size=8, timeout=10.0):
+        """初始化
+        :param socket_path: 推理服务的 Unix 域套接字路径
+        :param pool_size: 最大连接数
+        :param timeout: 获取连接及单次调用的超时时间（秒）
+        """
+        self.socket_path = socket_path
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._pool = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def predict(self, texts, apply_post_processing=True, deadline=None):
+        """对文本进行分类预测"""
+        if not texts:
+            return []
+        request = {"texts": list(texts), "apply_post_processing": apply_post_processing}
+        return self._call(OP_CLASSIFY, request, deadline)["predictions"]
+
+    def predict_logits(self, texts, deadline=None):
+        """批量计算分类 logits，返回 (文本数, 类别数) 的嵌套列表"""
+        if not texts:
+            return []
+        request = {"texts": list(texts), "apply_post_processing": False}
+        return self._call(OP_CLASSIFY, request, deadline)["logits"]
+
+    def embed(self, texts, deadline=None):
+        """批量编码文本，返回 float32 向量矩阵"""
+        return self._call(OP_EMBED, {"texts": list(texts)}, deadline)
+
+    def search(self, questions, top_k=5, deadline=None):
+        """批量检索，每个问题返回 {"answer": 答案, "hits": [[句子, 分数], ...]}"""
+        if not questions:
+            return []
+        return self._call(OP_SEARCH, {"texts": list(questions), "top_k": top_k}, deadline)["results"]
+
+    def retrieve_many(self, questions, top_k=5, deadline=None):
+        """批量检索，每个问题返回 [(句子, 分数), ...]"""
+        results = self.search(questions, top_k, deadline)
+        return [[(sentence, score) for sentence, score in r["hits"]] for r in results]
+
+    def retrieve(self, question, top_k=5, deadline=None):
+        """执行检索，返回所有相关的内容"""
+        return self.search([question], top_k, deadline)[0]["answer"]
+
+    def admin(self, action):
+        """模型管理操作：status / retrain / rollback"""
+        return self._call(OP_ADMIN, {"action": action})
+
+    def _apply_post_processing(self, text, pred):
+        """关键词规则在本地执行，无需访问推理服务"""
+        return apply_keyword_rules(text, pred)
+
+    def ping(self):
+        try:
+            self._call(OP_PING)
+            return True
+        except (InferenceError, DeadlineExceeded):
+            return False
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def _call(self, op, request=None, deadline=None):
+        timeout = self.timeout
+        if deadline is not None:
+            deadline.check()
+            timeout = min(timeout, deadline.remaining())
+            timeout_ms = int(timeout * 1000)
+            if timeout_ms <= 0:
+                raise DeadlineExceeded("请求剩余时间不足，未调用推理服务")
+            request = dict(request, timeout_ms=timeout_ms)
+        payload = encode_json(request) if request is not None else b""
+
+        sock = self._acquire(timeout)
+        try:
+            sock.settimeout(timeout)
+            send_frame(sock, op, payload)
+            _, status, response = recv_frame(sock)
+        except (OSError, ProtocolError) as e:
+            # 连接状态未知，直接丢弃
+            self._discard(sock)
+            if deadline is not None and deadline.expired():
+                raise DeadlineExceeded("推理服务调用超过请求截止时间") from e
+            raise InferenceError(f"推理服务调用失败: {str(e)}") from e
+        self._pool.put(sock)
+        if status == STATUS_DEADLINE:
+            raise DeadlineExceeded(response.decode("utf-8"))
+        if status != STATUS_OK:
+            raise InferenceError(response.decode("utf-8"))
+        if op == OP_EMBED:
+            return decode_matrix(response)
+        return decode_json(response) if response else None
+
+    def _acquire(self, timeout):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = self._created < self.pool_size
+            if can_create:
+                self._created += 1
+        if can_create:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.settimeout(timeout)
+                sock.connect(self.socket_path)
+                return sock
+            except OSError as e:
+                self._discard(sock)
+                raise InferenceError(f"无法连接推理服务: {str(e)}") from e
+
+        try:
+            return self._pool.get(timeout=timeout)
+        except queue.Empty:
+            raise InferenceError("推理服务连接池繁忙，获取连接超时")
+
+    def _discard(self, sock):
+        sock.close()
+        with self._lock:
+            self._created -= 1
+
+
+class RemoteRetrainer:
+    """与 Retrainer 接口一致，把模型管理操作转发给推理服务"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def start(self):
+        return self.client.admin("retrain")["started"]
+
+    def rollback(self):
+        return self.client.admin("rollback")["version"]
+
+    def status(self):
+        return self.client.admin("status")
@@ -0,0 +1,70 @@
+import json
+import struct
+import numpy as np
+
+# 帧格式: 头部(操作码 1B, 状态 1B, 负载长度 4B, 网络字节序) + 负载
+HEADER = struct.Struct("!BBI")
+MAX_PAYLOAD = 64 * 1024 * 1024
+
+# 操作码
+OP_CLASSIFY = 1
+OP_EMBED = 2
+OP_SEARCH = 3
+OP_PING = 4
+OP_ADMIN = 5  # 模型管理：status / retrain / rollback
+
+# 状态
+STATUS_OK = 0
+STATUS_ERROR = 1
+STATUS_DEADLINE = 2  # 请求在推理服务中已超过截止时间
+
+# 向量矩阵负载: 行数 4B, 维度 4B, 之后为 float32 数据
+MATRIX_HEADER = struct.Struct("!II")
+
+
+class ProtocolError(Exception):
+    """帧格式错误或连接中断"""
+
+
+def send_frame(sock, op, payload=b"", status=STATUS_OK):
+    sock.sendall(HEADER.pack(op, status, len(payload)) + payload)
+
+
+def recv_frame(sock):
+    """读取一帧，返回 (op, status, payload)"""
+    op, status, length = HEADER.unpack(_recv_exact(sock, HEADER.size))
+    if length > MAX_PAYLOAD:
+        raise ProtocolError(f"负载过大: {length} 字节")
+    return op, status, _recv_exact(sock, length)
+
+
+def _recv_exact(sock, size):
+    buf = bytearray(size)
+    view = memoryview(buf)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:], size - received)
+        if n == 0:
+            raise ProtocolError("连接已关闭")
+        received += n
+    return bytes(buf)
+
+
+def encode_json(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def decode_json(payload):
+    return json.loads(payload.decode("utf-8"))
+
+
+def encode_matrix(matrix):
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    rows, dim = matrix.shape
+    return MATRIX_HEADER.pack(rows, dim) + matrix.tobytes()
+
+
+def decode_matrix(payload):
+    rows, dim = MATRIX_HEADER.unpack_from(payload)
+    data = np.frombuffer(payload, dtype=np.float32, offset=MATRIX_HEADER.size)
+    return data.reshape(rows, dim)
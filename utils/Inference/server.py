@@ -0,0 +1,219 @@
+import os
+import queue
+import threading
+import time
+import socketserver
+from concurrent.futures import Future
+
+from utils.Admission.deadline import DeadlineExceeded
+from utils.Inference.protocol import (
+    OP_CLASSIFY, OP_EMBED, OP_SEARCH, OP_PING, OP_ADMIN, STATUS_ERROR, STATUS_DEADLINE,
+    ProtocolError, send_frame, recv_frame, encode_json, decode_json, encode_matrix,
+)
+
+# 单个检索请求的 top_k 上限，index.search 的结果数组大小为 批大小 × top_k
+MAX_TOP_K = 100
+
+
+class _Batcher(threading.Thread):
+    """把来自不同连接的请求合并成批次，交给同一个处理函数执行
+
+    handler 接收所有请求条目拼接成的列表，返回等长的结果序列。
+    """
+
+    def __init__(self, name, handler, max_batch=32, max_wait_ms=5):
+        super().__init__(name=name, daemon=True)
+        self.handler = handler
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+
+    def submit(self, items, deadline=None):
+        """提交一组条目；deadline 为 time.monotonic() 时间点，过期的请求不再执行"""
+        future = Future()
+        self._queue.put((items, future, deadline))
+        return future
+
+    def run(self):
+        while True:
+            jobs = [self._queue.get()]
+            size = len(jobs[0][0])
+            deadline = time.monotonic() + self.max_wait
+            # 在等待窗口内尽量凑满一个批次
+            while size < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    job = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                jobs.append(job)
+                size += len(job[0])
+            self._run_batch(jobs)
+
+    def _run_batch(self, jobs):
+        now = time.monotonic()
+        live = []
+        for job_items, future, deadline in jobs:
+            if deadline is not None and now >= deadline:
+                # 不能用内置 TimeoutError：它是 OSError 的子类，会被当作连接错误
+                future.set_exception(DeadlineExceeded("请求已超过截止时间"))
+            else:
+                live.append((job_items, future))
+        if not live:
+            return
+
+        items = [item for job_items, _ in live for item in job_items]
+        try:
+            results = self.handler(items)
+        except Exception as e:
+            if len(live) == 1:
+                live[0][1].set_exception(e)
+                return
+            # 合并批次失败时逐个重跑，只让出错的请求失败
+            for job_items, future in live:
+                try:
+                    future.set_result(self.handler(job_items))
+                except Exception as job_error:
+                    future.set_exception(job_error)
+            return
+        offset = 0
+        for job_items, future in live:
+            future.set_result(results[offset:offset + len(job_items)])
+            offset += len(job_items)
+
+
+class InferenceServer:
+    """推理服务：持有分类器与检索器，通过 Unix 域套接字为所有 Web 进程提供服务"""
+
+    def __init__(self, classifier, retriever, socket_path, max_batch=32, max_wait_ms=5, retrainer=None):
+        """初始化
+        :param classifier: 已加载的 TextClassifier 或 HotSwapClassifier
+        :param retriever: RAGRetriever 实例
+        :param socket_path: Unix 域套接字路径
+        :param max_batch: 单个批次的最大条目数
+        :param max_wait_ms: 凑批次的最长等待时间（毫秒）
+        :param retrainer: 可选，Retrainer 实例，提供模型管理操作
+        """
+        self.classifier = classifier
+        self.retriever = retriever
+        self.socket_path = socket_path
+        self.retrainer = retrainer
+        self.batchers = {
+            OP_CLASSIFY: _Batcher("classify", self._classify_batch, max_batch, max_wait_ms),
+            OP_EMBED: _Batcher("embed", self.retriever.encode_queries, max_batch, max_wait_ms),
+            OP_SEARCH: _Batcher("search", self._search_batch, max_batch, max_wait_ms),
+        }
+        self._server = None
+
+    def serve_forever(self):
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        for batcher in self.batchers.values():
+            batcher.start()
+
+        server = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                server._handle_connection(self.request)
+
+        self._server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        self._server.daemon_threads = True
+        print(f"✅ 推理服务已启动: {self.socket_path}")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+
+    def _handle_connection(self, sock):
+        while True:
+            try:
+                op, _, payload = recv_frame(sock)
+            except (ProtocolError, OSError):
+                return
+            try:
+                response = self._dispatch(op, payload)
+                send_frame(sock, op, response)
+            except (ProtocolError, OSError):
+                return
+            except DeadlineExceeded as e:
+                send_frame(sock, op, str(e).encode("utf-8"), status=STATUS_DEADLINE)
+            except Exception as e:
+                send_frame(sock, op, str(e).encode("utf-8"), status=STATUS_ERROR)
+
+    def _dispatch(self, op, payload):
+        if op == OP_PING:
+            return b""
+        if op == OP_ADMIN:
+            return encode_json(self._admin(decode_json(payload)))
+        if op not in self.batchers:
+            raise ValueError(f"未知操作码: {op}")
+
+        request = decode_json(payload)
+        texts = request.get("texts") if isinstance(request, dict) else None
+        if not isinstance(texts, list) or not texts or not all(isinstance(t, str) for t in texts):
+            raise ValueError("texts 必须是非空的字符串列表")
+        deadline = None
+        if "timeout_ms" in request:
+            deadline = time.monotonic() + request["timeout_ms"] / 1000
+
+        if op == OP_CLASSIFY:
+            flag = request.get("apply_post_processing", True)
+            items = [(text, flag) for text in request["texts"]]
+            results = self.batchers[op].submit(items, deadline).result()
+            return encode_json({
+                "predictions": [pred for pred, _ in results],
+                "logits": [logits for _, logits in results],
+            })
+        if op == OP_EMBED:
+            return encode_matrix(self.batchers[op].submit(request["texts"], deadline).result())
+
+        top_k = request.get("top_k", 5)
+        if not isinstance(top_k, int) or isinstance(top_k, bool) or not 0 < top_k <= MAX_TOP_K:
+            raise ValueError(f"top_k 必须是 1 到 {MAX_TOP_K} 之间的整数")
+        items = [(text, top_k) for text in request["texts"]]
+        return encode_json({"results": list(self.batchers[op].submit(items, deadline).result())})
+
+    def _admin(self, request):
+        if self.retrainer is None:
+            raise ValueError("推理服务未启用模型管理")
+        action = request.get("action") if isinstance(request, dict) else None
+        if action == "status":
+            return self.retrainer.status()
+        if action == "retrain":
+            return {"started": self.retrainer.start()}
+        if action == "rollback":
+            return {"version": self.retrainer.rollback()}
+        raise ValueError(f"未知的管理操作: {action}")
+
+    def _classify_batch(self, items):
+        texts = [text for text, _ in items]
+        logits = self.classifier.predict_logits(texts)
+        predictions = logits.argmax(dim=1).tolist()
+        # 后处理规则按各请求自身的设置单独应用
+        return [
+            (self.classifier._apply_post_processing(text, pred) if flag else pred, row)
+            for (text, flag), pred, row in zip(items, predictions, logits.tolist())
+        ]
+
+    def _search_batch(self, items):
+        # 一次编码、一次 index.search，再按各请求的 top_k 截取
+        texts = [text for text, _ in items]
+        max_k = max(top_k for _, top_k in items)
+        scores, indices = self.retriever.search(self.retriever.encode_queries(texts), max_k)
+        results = []
+        for (_, top_k), row_scores, row_indices in zip(items, scores, indices):
+            hits = self.retriever.collect(row_scores[:top_k], row_indices[:top_k])
+            results.append({
+                "answer": self.retriever.format_answer(hits),
+                "hits": [[sentence, score] for sentence, score in hits],
+            })
+        return results
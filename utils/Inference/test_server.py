@@ -0,0 +1,173 @@
+import os
+import sys
+import time
+import threading
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from utils.Admission.deadline import Deadline, DeadlineExceeded
+from utils.Inference.protocol import OP_EMBED
+from utils.Inference.server import InferenceServer, _Batcher, MAX_TOP_K
+from utils.Inference.client import InferenceClient, InferenceError, RemoteRetrainer
+
+
+class FakeRetriever:
+    """按句子编号返回固定分数的检索器"""
+    sentences = ["甲。", "乙。"]
+
+    def encode_queries(self, texts):
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+    def search(self, embeddings, top_k):
+        scores = np.tile(np.array([[0.9, 0.6]], dtype=np.float32), (len(embeddings), 1))
+        indices = np.tile(np.array([[0, 1]]), (len(embeddings), 1))
+        return scores[:, :top_k], indices[:, :top_k]
+
+    def collect(self, scores, indices):
+        return [(self.sentences[i], float(s)) for s, i in zip(scores, indices)]
+
+    @staticmethod
+    def format_answer(hits):
+        return " ".join(s for s, _ in hits)
+
+
+@pytest.fixture
+def client(tmp_path):
+    socket_path = str(tmp_path / "inference.sock")
+    server = InferenceServer(None, FakeRetriever(), socket_path, max_wait_ms=1)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    for _ in range(100):
+        if os.path.exists(socket_path):
+            break
+        time.sleep(0.01)
+    client = InferenceClient(socket_path, timeout=2)
+    yield client
+    client.close()
+    server.shutdown()
+
+
+def test_search_round_trip(client):
+    result = client.search(["问题"], top_k=1)[0]
+    assert result["answer"] == "甲。"
+    assert result["hits"] == [["甲。", pytest.approx(0.9)]]
+    assert client.embed(["a", "b"]).shape == (2, 4)
+
+
+@pytest.mark.parametrize("texts", [[None], [1], []])
+def test_invalid_texts_are_rejected(client, texts):
+    if not texts:
+        assert client.search(texts) == []
+        return
+    with pytest.raises(InferenceError):
+        client.search(texts)
+    # 连接仍可继续使用
+    assert client.search(["问题"])[0]["answer"] == "甲。 乙。"
+
+
+@pytest.mark.parametrize("top_k", [0, -1, MAX_TOP_K + 1, True])
+def test_out_of_range_top_k_is_rejected(client, top_k):
+    with pytest.raises(InferenceError):
+        client.search(["问题"], top_k=top_k)
+    assert client.search(["问题"], top_k=MAX_TOP_K)[0]["answer"] == "甲。 乙。"
+
+
+def test_failed_job_does_not_fail_batch():
+    def handler(items):
+        if "坏" in items:
+            raise ValueError("bad item")
+        return [item * 2 for item in items]
+
+    batcher = _Batcher("test", handler, max_batch=8, max_wait_ms=50)
+    good = batcher.submit(["a", "b"])
+    bad = batcher.submit(["坏"])
+    batcher.start()
+
+    assert good.result(timeout=2) == ["aa", "bb"]
+    with pytest.raises(ValueError):
+        bad.result(timeout=2)
+
+
+class FakeRetrainer:
+    def __init__(self):
+        self.started = 0
+
+    def start(self):
+        self.started += 1
+        return self.started == 1
+
+    def rollback(self):
+        return "initial"
+
+    def status(self):
+        return {"current_version": "v1", "training": self.started > 0}
+
+
+def test_admin_ops_are_forwarded(tmp_path):
+    socket_path = str(tmp_path / "admin.sock")
+    server = InferenceServer(None, FakeRetriever(), socket_path, retrainer=FakeRetrainer())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    for _ in range(100):
+        if os.path.exists(socket_path):
+            break
+        time.sleep(0.01)
+
+    remote = RemoteRetrainer(InferenceClient(socket_path, timeout=2))
+    try:
+        assert remote.start() is True
+        assert remote.start() is False
+        assert remote.rollback() == "initial"
+        assert remote.status() == {"current_version": "v1", "training": True}
+        with pytest.raises(InferenceError):
+            remote.client.admin("unknown")
+    finally:
+        remote.client.close()
+        server.shutdown()
+
+
+def test_admin_ops_require_retrainer(client):
+    with pytest.raises(InferenceError):
+        client.admin("status")
+
+
+def test_expired_job_gets_deadline_status(tmp_path):
+    class SlowRetriever(FakeRetriever):
+        def encode_queries(self, texts):
+            time.sleep(0.2)
+            return super().encode_queries(texts)
+
+    socket_path = str(tmp_path / "slow.sock")
+    server = InferenceServer(None, SlowRetriever(), socket_path, max_wait_ms=1)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    for _ in range(100):
+        if os.path.exists(socket_path):
+            break
+        time.sleep(0.01)
+
+    slow = InferenceClient(socket_path, timeout=2)
+    hurried = InferenceClient(socket_path, timeout=2)
+    try:
+        # 第一个请求占住批处理线程，第二个请求在排队期间过期
+        blocker = threading.Thread(target=slow.embed, args=(["a"],))
+        blocker.start()
+        time.sleep(0.05)
+        with pytest.raises(DeadlineExceeded):
+            hurried._call(OP_EMBED, {"texts": ["b"], "timeout_ms": 50})
+        blocker.join()
+        # 连接未被断开，可以继续使用
+        assert hurried.embed(["c"]).shape == (1, 4)
+    finally:
+        slow.close()
+        hurried.close()
+        server.shutdown()
+
+
+def test_exhausted_deadline_is_rejected_locally(client):
+    deadline = Deadline(10)
+    deadline.expires_at = time.monotonic() + 0.0004
+    with pytest.raises(DeadlineExceeded):
+        client.search(["问题"], deadline=deadline)
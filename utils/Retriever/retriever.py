@@ -1,11 +1,94 @@
 import os
 import numpy as np
 import faiss
+import torch
 from sentence_transformers import SentenceTransformer
 from typing import List, Dict, Tuple
 import docx
 from docx import Document
 import re
+from utils.Classifier.token_cache import shared_token_cache
+
+class RAGRetriever:
+    """句子级向量检索器，可直接作为检索函数调用"""
+
+    def __init__(self, model, sentences: List[str], similarity_threshold: float = 0.5, token_cache=None):
+        self.model = model
+        self.token_cache = shared_token_cache if token_cache is None else token_cache
+        self.sentences = sentences
+        self.similarity_threshold = similarity_threshold
+
+        dim = model.get_sentence_embedding_dimension()
+        embeddings = self.encode(sentences)
+        self.index = faiss.IndexFlatIP(dim)
+        self.index.add(embeddings)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """批量编码文本，返回归一化后的 float32 向量矩阵"""
+        embeddings = self.model.encode(list(texts), normalize_embeddings=True)
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
+
+    def query_token_ids(self, questions: List[str]) -> List[List[int]]:
+        """查询的 token ID，经由与分类器共享的缓存获取
+
+        与 SentenceTransformer.tokenize 的预处理保持一致（去除首尾空白、按模块设置转小写），
+        保证查询向量与用 model.encode 构建的语料向量处于同一空间。
+        """
+        if getattr(self.model[0], "do_lower_case", False):
+            questions = [q.lower() for q in questions]
+        return self.token_cache.encode(self.model.tokenizer, questions, max_length=self.model.max_seq_length)
+
+    def encode_queries(self, questions: List[str]) -> np.ndarray:
+        """编码查询，结果与 model.encode(normalize_embeddings=True) 一致"""
+        tokenizer = self.model.tokenizer
+        input_ids = self.query_token_ids(questions)
+        features = tokenizer.pad({"input_ids": input_ids}, padding=True, return_tensors="pt")
+        features = {k: v.to(self.model.device) for k, v in features.items()}
+
+        self.model.eval()
+        with torch.no_grad():
+            embeddings = self.model(features)["sentence_embedding"]
+        embeddings = torch.nn.functional.normalize(embeddings, p=2, dim=1)
+        return np.ascontiguousarray(embeddings.cpu().numpy(), dtype=np.float32)
+
+    def search(self, query_embeddings: np.ndarray, top_k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """在索引中检索，返回 (scores, indices)，每行对应一个查询"""
+        return self.index.search(np.ascontiguousarray(query_embeddings, dtype=np.float32), top_k)
+
+    def collect(self, scores, indices) -> List[Tuple[str, float]]:
+        """收集单个查询中超过阈值的句子，去重并保留原始顺序"""
+        hits = []
+        seen = set()
+        for score, idx in zip(scores, indices):
+            if idx < 0 or score <= self.similarity_threshold:
+                continue
+            sentence = self.sentences[idx]
+            if sentence not in seen:
+                seen.add(sentence)
+                hits.append((sentence, float(score)))
+        return hits
+
+    def retrieve_many(self, questions: List[str], top_k: int = 5, deadline=None) -> List[List[Tuple[str, float]]]:
+        """批量检索，一次编码、一次 index.search；deadline 为可选的请求截止时间"""
+        if deadline is not None:
+            deadline.check()
+        query_embeddings = self.encode_queries(questions)
+        if deadline is not None:
+            deadline.check()
+        scores, indices = self.search(query_embeddings, top_k)
+        return [self.collect(s, i) for s, i in zip(scores, indices)]
+
+    @staticmethod
+    def format_answer(hits: List[Tuple[str, float]]) -> str:
+        """将检索到的句子组合成连贯的答案"""
+        if hits:
+            return " ".join(sentence for sentence, _ in hits)
+        return "未找到相关答案"
+
+    def __call__(self, question: str, top_k: int = 5, deadline=None) -> str:
+        """执行检索，返回所有相关的内容"""
+        return self.format_answer(self.retrieve_many([question], top_k, deadline)[0])
+
 
 def create_rag_retriever(docx_path: str, model_name: str = "BAAI/bge-small-zh-v1.5", similarity_threshold: float = 0.5) -> callable:
     """
@@ -40,44 +123,14 @@ def create_rag_retriever(docx_path: str, model_name: str = "BAAI/bge-small-zh-v1
             
         # 初始化模型
         model = SentenceTransformer(model_name)
-        dim = model.get_sentence_embedding_dimension()
         
         # 构建索引
         sentences = []
         for para in documents:
             sentences.extend(split_into_sentences(para))
             
-        embeddings = model.encode(sentences, normalize_embeddings=True)
-        index = faiss.IndexFlatIP(dim)
-        index.add(embeddings.astype(np.float32))
-        
-        def retrieve(question: str, top_k: int = 5) -> str:
-            """执行检索，返回所有相关的内容"""
-            query_embedding = model.encode(question, normalize_embeddings=True)
-            scores, indices = index.search(np.array([query_embedding]), top_k)
-            
-            # 收集所有超过阈值的句子
-            relevant_sentences = []
-            for score, idx in zip(scores[0], indices[0]):
-                if score > similarity_threshold:
-                    relevant_sentences.append(sentences[idx])
-            
-            if relevant_sentences:
-                # 去重并保留原始顺序
-                seen = set()
-                unique_sentences = []
-                for s in relevant_sentences:
-                    if s not in seen:
-                        seen.add(s)
-                        unique_sentences.append(s)
-                
-                # 组合成连贯的答案
-                answer = " ".join(unique_sentences)
-                return answer
-            return "未找到相关答案"
-            
-        return retrieve
+        return RAGRetriever(model, sentences, similarity_threshold)
         
     except Exception as e:
         print(f"初始化检索器失败: {str(e)}")
-        return lambda _: "检索器初始化失败，请检查文档路径和格式"
+        return lambda *args, **kwargs: "检索器初始化失败，请检查文档路径和格式"
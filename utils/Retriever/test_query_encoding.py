@@ -0,0 +1,46 @@
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+sys.path.append(str(project_root / "BackEnd"))
+
+import pytest
+
+np = pytest.importorskip("numpy")
+sentence_transformers = pytest.importorskip("sentence_transformers")
+pytest.importorskip("faiss")
+
+from utils.Classifier.token_cache import TokenCache
+from utils.Retriever.retriever import RAGRetriever
+from dataset import questions
+
+MODEL_NAME = "BAAI/bge-small-zh-v1.5"
+
+
+@pytest.fixture(scope="module")
+def retriever():
+    try:
+        model = sentence_transformers.SentenceTransformer(MODEL_NAME)
+    except Exception as e:
+        pytest.skip(f"无法加载 {MODEL_NAME}: {e}")
+    return RAGRetriever(model, questions[:5], token_cache=TokenCache(maxsize=len(questions)))
+
+
+def test_query_token_ids_match_model_tokenize(retriever):
+    """缓存路径的 token ID 必须与 SentenceTransformer.tokenize 一致"""
+    features = retriever.model.tokenize(questions)
+    expected = [
+        ids[mask.bool()].tolist()
+        for ids, mask in zip(features["input_ids"], features["attention_mask"])
+    ]
+    assert retriever.query_token_ids(questions) == expected
+
+
+def test_query_embeddings_match_model_encode(retriever):
+    """查询向量必须与构建语料索引所用的 model.encode 一致"""
+    expected = retriever.model.encode(questions, normalize_embeddings=True)
+    np.testing.assert_allclose(retriever.encode_queries(questions), expected, atol=1e-5)
+    # 带多余空白的问题结果相同
+    padded = ["  " + q + " " for q in questions[:3]]
+    np.testing.assert_allclose(retriever.encode_queries(padded), expected[:3], atol=1e-5)
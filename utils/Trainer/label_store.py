@@ -0,0 +1,73 @@
+import os
+import json
+import time
+import threading
+
+
+class LabelStore:
+    """持续累积的标注数据：原始数据集 + 用户纠正
+
+    纠正以 JSONL 追加写入，同一文本以最后一次标注为准。
+    """
+
+    def __init__(self, path, questions=(), labels=()):
+        """初始化
+        :param path: 纠正记录的 JSONL 文件路径
+        :param questions: 原始数据集问题
+        :param labels: 原始数据集标签
+        """
+        self.path = path
+        self.base = list(zip(questions, labels))
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def add(self, text, label, source="correction"):
+        """追加一条标注"""
+        record = {
+            "text": text,
+            "label": int(label),
+            "source": source,
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return record
+
+    def corrections(self):
+        """读取全部纠正记录"""
+        if not os.path.exists(self.path):
+            return []
+        records = []
+        with self._lock:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        # 跳过写入中断产生的残缺行
+                        continue
+        return records
+
+    def examples(self):
+        """返回用于训练的 (questions, labels)，跳过文本或标签不合法的记录"""
+        merged = dict(self.base)
+        for record in self.corrections():
+            if not self._valid(record):
+                continue
+            merged.pop(record["text"], None)
+            merged[record["text"]] = record["label"]
+        return list(merged.keys()), list(merged.values())
+
+    @staticmethod
+    def _valid(record):
+        if not isinstance(record, dict):
+            return False
+        label = record.get("label")
+        return (
+            isinstance(record.get("text"), str) and record["text"]
+            and not isinstance(label, bool) and label in (0, 1)
+        )
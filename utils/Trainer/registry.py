@@ -0,0 +1,121 @@
+import os
+import json
+import time
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from utils.file_lock import file_lock
+
+# 版本目录启用前已有的训练模型
+INITIAL_VERSION = "initial"
+
+
+class ModelRegistry:
+    """版本化的模型目录
+
+    每次训练写入 versions/<版本号>，registry.json 记录当前版本和切换历史，
+    用于回滚。多个进程共用同一目录时，状态在文件锁内重新读取后再修改。
+    """
+
+    def __init__(self, versions_dir, initial_path=None):
+        """初始化
+        :param versions_dir: 版本目录
+        :param initial_path: 可选，尚无任何版本时作为初始版本的模型路径
+        """
+        self.versions_dir = versions_dir
+        self.initial_path = initial_path
+        self.state_path = os.path.join(versions_dir, "registry.json")
+        self.lock_path = self.state_path + ".lock"
+        self._lock = threading.Lock()
+        os.makedirs(versions_dir, exist_ok=True)
+        self._state = self._load_state()
+
+    def new_version(self):
+        """分配一个新版本号，返回 (版本号, 目录路径)
+
+        通过创建 <目录>.tmp 占用版本号，同一秒内多个进程开始训练也不会分到同一目录；
+        训练进程写入该临时目录，完成后再重命名为正式目录。
+        """
+        stamp = time.strftime("v%Y%m%d-%H%M%S")
+        name, suffix = stamp, 1
+        while True:
+            if not os.path.exists(self.path(name)):
+                try:
+                    os.mkdir(self.path(name) + ".tmp")
+                    return name, self.path(name)
+                except FileExistsError:
+                    pass
+            name = f"{stamp}-{suffix}"
+            suffix += 1
+
+    def path(self, name):
+        if name == INITIAL_VERSION and self.initial_path:
+            return self.initial_path
+        return os.path.join(self.versions_dir, name)
+
+    @property
+    def current(self):
+        with self._locked() as state:
+            return state["current"]
+
+    def current_path(self):
+        return self.path(self.current) if self.current else None
+
+    def activate(self, name):
+        """将指定版本设为当前版本"""
+        with self._locked() as state:
+            if state["current"]:
+                state["history"].append(state["current"])
+            state["current"] = name
+            self._save_state()
+
+    def rollback(self):
+        """回到上一个版本，返回该版本号；没有历史版本时返回 None"""
+        with self._locked() as state:
+            while state["history"]:
+                name = state["history"].pop()
+                if os.path.exists(self.path(name)):
+                    state["current"] = name
+                    self._save_state()
+                    return name
+            return None
+
+    def previous(self):
+        """上一个可回滚的版本"""
+        with self._locked() as state:
+            for name in reversed(state["history"]):
+                if os.path.exists(self.path(name)):
+                    return name
+            return None
+
+    def versions(self):
+        return sorted(
+            name for name in os.listdir(self.versions_dir)
+            if os.path.isdir(self.path(name)) and not name.endswith(".tmp")
+        )
+
+    @contextmanager
+    def _locked(self):
+        """加锁并重新读取状态，其它进程的切换和回滚不会被本进程的旧状态覆盖"""
+        with self._lock, file_lock(self.lock_path):
+            self._state = self._load_state()
+            yield self._state
+
+    def _load_state(self):
+        state = {"current": None, "history": []}
+        if os.path.exists(self.state_path):
+            try:
+                with open(self.state_path, "r", encoding="utf-8") as f:
+                    state = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"❌ 模型版本记录读取失败: {str(e)}")
+        if state["current"] is None and self.initial_path:
+            state["current"] = INITIAL_VERSION
+        return state
+
+    def _save_state(self):
+        fd, tmp_path = tempfile.mkstemp(dir=self.versions_dir, suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.state_path)
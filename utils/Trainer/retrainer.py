@@ -0,0 +1,184 @@
+import os
+import sys
+import shutil
+import threading
+import multiprocessing
+from collections import deque
+
+
+def train_version(base_model_path, output_path, questions, labels, epochs=5):
+    """训练进程入口：从基础模型训练并写入新的版本目录
+
+    先写入临时目录，完整保存后再重命名，服务端不会读到写了一半的模型。
+    """
+    from utils.Classifier.classifier import TextClassifier
+    from utils.Classifier.data_utils import DataAugmenter
+
+    tmp_path = output_path + ".tmp"
+    classifier = TextClassifier(model_path=base_model_path, num_labels=2)
+    if not classifier.load_model():
+        sys.exit(1)
+    if not classifier.train(questions, labels, batch_size=4, epochs=epochs, augmenter=DataAugmenter()):
+        sys.exit(1)
+    if not classifier.save_model(save_path=tmp_path):
+        sys.exit(1)
+    os.replace(tmp_path, output_path)
+
+
+class HotSwapClassifier:
+    """可在线替换模型的分类器包装
+
+    每次 predict 只读取一次当前模型引用，整批请求都由同一个模型完成；
+    替换只是引用赋值，正在处理的批次不受影响。
+    """
+
+    def __init__(self, classifier, version=None, recent_size=500):
+        self.classifier = classifier
+        self.version = version
+        # 最近的线上请求，用于替换前的影子对比
+        self.recent = deque(maxlen=recent_size)
+
+    def predict(self, texts, apply_post_processing=True, deadline=None):
+        classifier = self.classifier
+        self.recent.extend(texts)
+        return classifier.predict(texts, apply_post_processing, deadline)
+
+    def predict_logits(self, texts, deadline=None):
+        classifier = self.classifier
+        self.recent.extend(texts)
+        return classifier.predict_logits(texts, deadline)
+
+    def swap(self, classifier, version):
+        """替换当前模型，返回被替换下来的模型"""
+        previous = self.classifier
+        self.classifier, self.version = classifier, version
+        return previous
+
+    def __getattr__(self, name):
+        return getattr(self.classifier, name)
+
+
+class Retrainer:
+    """后台重训练：独立进程训练 -> 影子对比 -> 原子替换，并支持回滚"""
+
+    def __init__(self, holder, registry, label_store, base_model_path, min_agreement=0.7, epochs=5):
+        """初始化
+        :param holder: 正在服务的 HotSwapClassifier
+        :param registry: ModelRegistry
+        :param label_store: LabelStore
+        :param base_model_path: 训练起点的基础模型路径
+        :param min_agreement: 影子对比中与当前模型一致率的下限，低于此值不替换
+        """
+        self.holder = holder
+        self.registry = registry
+        self.label_store = label_store
+        self.base_model_path = base_model_path
+        self.min_agreement = min_agreement
+        self.epochs = epochs
+        self.last_result = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """启动一次后台训练，已有训练在进行时返回 False"""
+        with self._lock:
+            if self.running:
+                return False
+            self._thread = threading.Thread(target=self._run, name="retrainer", daemon=True)
+            self._thread.start()
+            return True
+
+    def rollback(self):
+        """切换回上一个版本，返回该版本号；无可回滚版本或加载失败返回 None"""
+        with self._lock:
+            name = self.registry.previous()
+            if name is None:
+                return None
+            classifier = self._load(name)
+            if classifier is None:
+                return None
+            self.registry.rollback()
+            self.holder.swap(classifier, name)
+            print(f"✅ 已回滚到模型版本 {name}")
+            return name
+
+    def status(self):
+        return {
+            "current_version": self.holder.version,
+            "training": self.running,
+            "versions": self.registry.versions(),
+            "last_result": self.last_result,
+        }
+
+    def shadow_compare(self, candidate):
+        """在最近的线上请求上对比候选模型与当前模型，返回 (一致率, 样本数)"""
+        texts = list(self.holder.recent)
+        if not texts:
+            return None, 0
+        current = self.holder.classifier.predict(texts)
+        shadow = candidate.predict(texts)
+        agreed = sum(a == b for a, b in zip(current, shadow))
+        return agreed / len(texts), len(texts)
+
+    def _run(self):
+        name = None
+        try:
+            name, path = self.registry.new_version()
+            self._train(name, path)
+        except Exception as e:
+            # 后台线程中的异常不会传到请求方，记录到 last_result 供状态接口查看
+            self.last_result = {"version": name, "status": "failed", "error": str(e)}
+            print(f"❌ 模型版本 {name} 训练异常: {str(e)}")
+            if name is not None:
+                shutil.rmtree(self.registry.path(name) + ".tmp", ignore_errors=True)
+
+    def _train(self, name, path):
+        questions, labels = self.label_store.examples()
+        print(f"🔧 后台训练模型版本 {name}，样本数 {len(questions)}")
+
+        # 独立进程训练，不占用服务进程的 GIL 和内存
+        ctx = multiprocessing.get_context("spawn")
+        process = ctx.Process(
+            target=train_version,
+            args=(self.base_model_path, path, questions, labels, self.epochs),
+        )
+        process.start()
+        process.join()
+        if process.exitcode != 0 or not os.path.exists(path):
+            shutil.rmtree(path + ".tmp", ignore_errors=True)
+            self.last_result = {"version": name, "status": "failed"}
+            print(f"❌ 模型版本 {name} 训练失败")
+            return
+
+        candidate = self._load(name)
+        if candidate is None:
+            self.last_result = {"version": name, "status": "failed"}
+            return
+        self.last_result = self._promote(name, candidate)
+
+    def _promote(self, name, candidate):
+        """影子对比通过后切换到候选模型，返回本次训练结果"""
+        agreement, samples = self.shadow_compare(candidate)
+        result = {"version": name, "agreement": agreement, "shadow_samples": samples}
+        with self._lock:
+            if agreement is not None and agreement < self.min_agreement:
+                result["status"] = "rejected"
+                print(f"❌ 模型版本 {name} 影子对比一致率 {agreement:.2%} 过低，未替换")
+            else:
+                self.registry.activate(name)
+                self.holder.swap(candidate, name)
+                result["status"] = "active"
+                print(f"✅ 已切换到模型版本 {name}")
+        return result
+
+    def _load(self, name):
+        from utils.Classifier.classifier import TextClassifier
+
+        classifier = TextClassifier(model_path=self.registry.path(name), num_labels=2)
+        if not classifier.load_model():
+            return None
+        return classifier
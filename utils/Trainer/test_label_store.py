@@ -0,0 +1,36 @@
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from utils.Trainer.label_store import LabelStore
+
+
+def test_later_corrections_override_earlier_ones(tmp_path):
+    store = LabelStore(str(tmp_path / "labels.jsonl"), questions=["北京天气", "你好"], labels=[0, 0])
+    store.add("北京天气", 1)
+    store.add("新问题", 1)
+    store.add("北京天气", 0)
+
+    questions, labels = store.examples()
+    assert dict(zip(questions, labels)) == {"你好": 0, "新问题": 1, "北京天气": 0}
+    assert questions[-1] == "北京天气"  # 最后一次纠正排在最后
+
+
+def test_truncated_and_malformed_records_are_skipped(tmp_path):
+    path = tmp_path / "labels.jsonl"
+    records = [
+        {"text": ["a"], "label": 1},
+        {"text": {"a": 1}, "label": 0},
+        {"text": "标签越界", "label": 2},
+        {"text": "布尔标签", "label": True},
+        ["不是对象"],
+        {"text": "正常", "label": 1},
+    ]
+    lines = [json.dumps(r, ensure_ascii=False) for r in records]
+    path.write_text("\n".join(lines) + '\n{"text": "写了一半', encoding="utf-8")
+
+    store = LabelStore(str(path))
+    assert len(store.corrections()) == len(records)
+    assert store.examples() == (["正常"], [1])
@@ -0,0 +1,67 @@
+import os
+import sys
+import shutil
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from utils.Trainer.registry import ModelRegistry, INITIAL_VERSION
+
+
+def make_version(registry):
+    """分配版本号并模拟训练完成（临时目录重命名为正式目录）"""
+    name, path = registry.new_version()
+    os.replace(path + ".tmp", path)
+    return name
+
+
+def test_activate_and_rollback(tmp_path):
+    initial = tmp_path / "trained_model"
+    initial.mkdir()
+    registry = ModelRegistry(str(tmp_path / "versions"), initial_path=str(initial))
+    assert registry.current == INITIAL_VERSION
+    assert registry.current_path() == str(initial)
+
+    first = make_version(registry)
+    registry.activate(first)
+    second = make_version(registry)
+    registry.activate(second)
+    assert registry.versions() == sorted([first, second])
+    assert registry.previous() == first
+
+    assert registry.rollback() == first
+    assert registry.rollback() == INITIAL_VERSION
+    assert registry.rollback() is None
+    assert registry.current == INITIAL_VERSION
+
+
+def test_rollback_skips_deleted_versions(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    names = [make_version(registry) for _ in range(3)]
+    for name in names:
+        registry.activate(name)
+
+    shutil.rmtree(registry.path(names[1]))
+    assert registry.previous() == names[0]
+    assert registry.rollback() == names[0]
+
+
+def test_new_version_reserves_unique_names(tmp_path):
+    first, second = ModelRegistry(str(tmp_path)), ModelRegistry(str(tmp_path))
+    names = [first.new_version()[0], second.new_version()[0], first.new_version()[0]]
+
+    assert len(set(names)) == 3
+    assert all(os.path.isdir(first.path(name) + ".tmp") for name in names)
+    assert first.versions() == []  # 训练未完成的版本不列出
+
+
+def test_state_is_shared_between_instances(tmp_path):
+    first, second = ModelRegistry(str(tmp_path)), ModelRegistry(str(tmp_path))
+    a = make_version(first)
+    b = make_version(first)
+
+    first.activate(a)
+    second.activate(b)  # 不会用旧状态覆盖 first 的切换
+    assert first.current == b
+    assert first.rollback() == a
+    assert second.current == a
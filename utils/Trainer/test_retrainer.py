@@ -0,0 +1,112 @@
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from utils.Trainer.registry import ModelRegistry
+from utils.Trainer.retrainer import HotSwapClassifier, Retrainer
+
+
+class FakeClassifier:
+    """所有问题都预测为同一标签的分类器"""
+
+    def __init__(self, label):
+        self.label = label
+
+    def predict(self, texts, apply_post_processing=True, deadline=None):
+        return [self.label for _ in texts]
+
+    def predict_logits(self, texts, deadline=None):
+        return [[1 - self.label, self.label] for _ in texts]
+
+
+class FakeRetrainer(Retrainer):
+    """按版本号返回预先准备好的模型，不读取磁盘"""
+
+    def __init__(self, *args, models=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.models = models or {}
+
+    def _load(self, name):
+        return self.models.get(name)
+
+
+class FailingLabelStore:
+    def examples(self):
+        raise ValueError("标注数据损坏")
+
+
+def make_retrainer(tmp_path, holder, **kwargs):
+    registry = ModelRegistry(str(tmp_path))
+    return FakeRetrainer(holder, registry, label_store=None, base_model_path="base", **kwargs)
+
+
+def make_version(registry):
+    name, path = registry.new_version()
+    os.replace(path + ".tmp", path)
+    return name
+
+
+def test_swap_replaces_model_and_records_traffic():
+    old, new = FakeClassifier(0), FakeClassifier(1)
+    holder = HotSwapClassifier(old, version="v1", recent_size=3)
+
+    assert holder.predict(["a", "b"]) == [0, 0]
+    assert holder.swap(new, "v2") is old
+    assert holder.version == "v2"
+    assert holder.predict_logits(["c", "d"]) == [[0, 1], [0, 1]]
+    assert list(holder.recent) == ["b", "c", "d"]
+    assert holder.label == 1  # 其余属性转发给当前模型
+
+
+def test_shadow_rejection_below_min_agreement(tmp_path):
+    holder = HotSwapClassifier(FakeClassifier(0), version="v1")
+    holder.predict(["a", "b", "c"])
+    retrainer = make_retrainer(tmp_path, holder, min_agreement=0.7)
+    name = make_version(retrainer.registry)
+
+    result = retrainer._promote(name, FakeClassifier(1))
+    assert result["status"] == "rejected"
+    assert (result["agreement"], result["shadow_samples"]) == (0, 3)
+    assert holder.version == "v1"
+    assert retrainer.registry.current is None
+
+
+def test_promote_activates_agreeing_candidate(tmp_path):
+    holder = HotSwapClassifier(FakeClassifier(0), version="v1")
+    holder.predict(["a"])
+    retrainer = make_retrainer(tmp_path, holder)
+    name = make_version(retrainer.registry)
+    candidate = FakeClassifier(0)
+
+    assert retrainer._promote(name, candidate)["status"] == "active"
+    assert holder.classifier is candidate
+    assert retrainer.registry.current == name
+
+
+def test_rollback_swaps_previous_version(tmp_path):
+    holder = HotSwapClassifier(FakeClassifier(1), version=None)
+    retrainer = make_retrainer(tmp_path, holder)
+    assert retrainer.rollback() is None
+
+    first, second = make_version(retrainer.registry), make_version(retrainer.registry)
+    retrainer.registry.activate(first)
+    retrainer.registry.activate(second)
+    retrainer.models[first] = previous = FakeClassifier(0)
+
+    assert retrainer.rollback() == first
+    assert holder.classifier is previous
+    assert holder.version == first
+    assert retrainer.registry.current == first
+
+
+def test_failed_run_is_reported(tmp_path):
+    holder = HotSwapClassifier(FakeClassifier(0))
+    retrainer = make_retrainer(tmp_path, holder)
+    retrainer.label_store = FailingLabelStore()
+
+    retrainer._run()
+    assert retrainer.last_result["status"] == "failed"
+    assert retrainer.last_result["error"] == "标注数据损坏"
+    assert not any(name.endswith(".tmp") for name in os.listdir(tmp_path))  # 占用的版本目录已清理
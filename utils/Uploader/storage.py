@@ -0,0 +1,191 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from utils.file_lock import file_lock
+
+
+class UploadTooLargeError(Exception):
+    """上传文件超过大小限制"""
+
+
+class EmptyUploadError(Exception):
+    """上传内容为空"""
+
+
+class HashingSpool:
+    """边写入边计算摘要的临时文件
+
+    可直接作为 Werkzeug 解析 multipart 时的文件容器使用，
+    数据按块落盘，内存占用与文件大小无关。
+    """
+
+    def __init__(self, tmp_dir, max_size, algorithm="sha256"):
+        fd, self.path = tempfile.mkstemp(dir=tmp_dir, suffix=".part")
+        self._file = os.fdopen(fd, "w+b")
+        self._hash = hashlib.new(algorithm)
+        self.max_size = max_size
+        self.size = 0
+
+    def write(self, data):
+        """写入一个数据块，同时更新摘要和大小"""
+        self.size += len(data)
+        if self.max_size and self.size > self.max_size:
+            self.discard()
+            raise UploadTooLargeError(f"文件超过大小限制 {self.max_size} 字节")
+        self._hash.update(data)
+        return self._file.write(data)
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+    def discard(self):
+        """丢弃临时文件（未提交时）"""
+        if not self._file.closed:
+            self._file.close()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        self.path = None
+
+    def close(self):
+        # 请求结束时 Werkzeug 会关闭所有文件，未提交的临时文件在此清理
+        self.discard()
+
+    def __getattr__(self, name):
+        # seek/read/tell 等其余文件操作交给底层文件对象
+        return getattr(self._file, name)
+
+
+class UploadStore:
+    """基于内容寻址的上传文件存储
+
+    文件以 SHA-256 摘要命名保存在 objects/<前两位>/<摘要> 下，
+    index.json 记录每个摘要对应的元数据；内容相同的重复上传只更新元数据。
+    多个 Web 进程共用同一目录时，索引在文件锁内重新读取后再修改。
+    """
+
+    def __init__(self, root, max_file_size=50 * 1024 * 1024, chunk_size=64 * 1024):
+        """初始化
+        :param root: 存储根目录
+        :param max_file_size: 单个文件的最大字节数，0 表示不限制
+        :param chunk_size: 流式读取时每块的字节数
+        """
+        self.root = root
+        self.max_file_size = max_file_size
+        self.chunk_size = chunk_size
+        self.objects_dir = os.path.join(root, "objects")
+        self.tmp_dir = os.path.join(root, "tmp")
+        self.index_path = os.path.join(root, "index.json")
+        self.lock_path = self.index_path + ".lock"
+        self._lock = threading.Lock()
+
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self._index = self._load_index()
+
+    def open_spool(self):
+        """创建一个新的临时写入文件"""
+        return HashingSpool(self.tmp_dir, self.max_file_size)
+
+    def save_stream(self, stream, filename):
+        """从输入流按块读取并保存，返回 (元数据, 是否重复)"""
+        spool = self.open_spool()
+        try:
+            while True:
+                chunk = stream.read(self.chunk_size)
+                if not chunk:
+                    break
+                spool.write(chunk)
+            return self.commit(spool, filename)
+        finally:
+            spool.discard()
+
+    def commit(self, spool, filename):
+        """将写完的临时文件移入内容寻址存储，返回 (元数据, 是否重复)"""
+        if spool.size == 0:
+            spool.discard()
+            raise EmptyUploadError("文件内容为空")
+        spool.flush()
+        digest = spool.hexdigest()
+        target = self.object_path(digest)
+        filename = os.path.basename(filename or "") or digest
+        now = time.strftime("%Y-%m-%d %H:%M:%S")
+
+        with self._locked() as index:
+            record = index.get(digest)
+            duplicated = record is not None and os.path.exists(target)
+            if duplicated:
+                spool.discard()
+            else:
+                spool._file.close()
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(spool.path, target)
+                spool.path = None
+                # 记录存在但对象文件丢失时只恢复文件，保留已有的文件名和上传次数
+                if record is None:
+                    record = {
+                        "digest": digest,
+                        "size": spool.size,
+                        "filenames": [],
+                        "created_at": now,
+                        "upload_count": 0,
+                    }
+                    index[digest] = record
+
+            if filename not in record["filenames"]:
+                record["filenames"].append(filename)
+            record["upload_count"] += 1
+            record["last_uploaded_at"] = now
+            self._save_index()
+            return dict(record), duplicated
+
+    def touch(self, digest, filename):
+        """客户端已提供摘要且内容已存在时，仅记录一次上传"""
+        with self._locked() as index:
+            record = index.get(digest)
+            if record is None or not os.path.exists(self.object_path(digest)):
+                return None
+            filename = os.path.basename(filename or "") or digest
+            if filename not in record["filenames"]:
+                record["filenames"].append(filename)
+            record["upload_count"] += 1
+            record["last_uploaded_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+            self._save_index()
+            return dict(record)
+
+    def lookup(self, digest):
+        """按摘要查询元数据，不存在返回 None"""
+        with self._locked() as index:
+            record = index.get(digest)
+            return dict(record) if record else None
+
+    def object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    @contextmanager
+    def _locked(self):
+        """加锁并重新读取索引，其它进程写入的记录不会被本进程的旧索引覆盖"""
+        with self._lock, file_lock(self.lock_path):
+            self._index = self._load_index()
+            yield self._index
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"❌ 上传索引读取失败，将重新建立: {str(e)}")
+            return {}
+
+    def _save_index(self):
+        # 先写临时文件再原子替换，避免写入中断导致索引损坏
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir, suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.index_path)
@@ -0,0 +1,89 @@
+import io
+import os
+import sys
+import hashlib
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+import pytest
+
+from utils.Uploader.storage import UploadStore, UploadTooLargeError, EmptyUploadError
+
+
+def test_repeat_upload_is_deduplicated(tmp_path):
+    store = UploadStore(str(tmp_path), chunk_size=7)
+    data = b"hello world" * 100
+
+    first, duplicated = store.save_stream(io.BytesIO(data), "a.txt")
+    assert not duplicated
+    assert first["digest"] == hashlib.sha256(data).hexdigest()
+    assert first["size"] == len(data)
+
+    second, duplicated = store.save_stream(io.BytesIO(data), "b.txt")
+    assert duplicated
+    assert second["digest"] == first["digest"]
+    assert second["filenames"] == ["a.txt", "b.txt"]
+    assert second["upload_count"] == 2
+    with open(store.object_path(first["digest"]), "rb") as f:
+        assert f.read() == data
+    assert os.listdir(store.tmp_dir) == []
+
+
+def test_too_large_upload_leaves_no_part_files(tmp_path):
+    store = UploadStore(str(tmp_path), max_file_size=10, chunk_size=4)
+
+    with pytest.raises(UploadTooLargeError):
+        store.save_stream(io.BytesIO(b"x" * 11), "big.bin")
+    assert [f for f in os.listdir(store.tmp_dir) if f.endswith(".part")] == []
+    assert os.listdir(store.objects_dir) == []
+
+
+def test_empty_upload_is_rejected(tmp_path):
+    store = UploadStore(str(tmp_path))
+
+    with pytest.raises(EmptyUploadError):
+        store.save_stream(io.BytesIO(b""), "empty.txt")
+    assert os.listdir(store.tmp_dir) == []
+
+
+def test_touch_unknown_digest(tmp_path):
+    store = UploadStore(str(tmp_path))
+    assert store.touch("0" * 64, "a.txt") is None
+
+    record, _ = store.save_stream(io.BytesIO(b"data"), "a.txt")
+    assert store.touch(record["digest"], "c.txt")["upload_count"] == 2
+
+
+def test_index_survives_restart(tmp_path):
+    store = UploadStore(str(tmp_path))
+    record, _ = store.save_stream(io.BytesIO(b"data"), "a.txt")
+
+    assert UploadStore(str(tmp_path)).lookup(record["digest"])["filenames"] == ["a.txt"]
+
+
+def test_stores_sharing_a_directory_merge_records(tmp_path):
+    # 模拟两个 Web 进程各自持有一个 UploadStore
+    first, second = UploadStore(str(tmp_path)), UploadStore(str(tmp_path))
+    a, _ = first.save_stream(io.BytesIO(b"aaa"), "a.txt")
+    b, _ = second.save_stream(io.BytesIO(b"bbb"), "b.txt")
+
+    record, duplicated = first.save_stream(io.BytesIO(b"bbb"), "b2.txt")
+    assert duplicated
+    assert record["filenames"] == ["b.txt", "b2.txt"]
+    assert second.touch(a["digest"], "a2.txt")["upload_count"] == 2
+    assert first.lookup(a["digest"])["filenames"] == ["a.txt", "a2.txt"]
+    assert UploadStore(str(tmp_path)).lookup(b["digest"])["upload_count"] == 2
+
+
+def test_missing_object_is_restored_and_record_kept(tmp_path):
+    store = UploadStore(str(tmp_path))
+    record, _ = store.save_stream(io.BytesIO(b"data"), "a.txt")
+    os.remove(store.object_path(record["digest"]))
+
+    restored, duplicated = store.save_stream(io.BytesIO(b"data"), "b.txt")
+    assert not duplicated
+    assert restored["filenames"] == ["a.txt", "b.txt"]
+    assert restored["upload_count"] == 2
+    assert restored["created_at"] == record["created_at"]
+    assert os.path.exists(store.object_path(record["digest"]))
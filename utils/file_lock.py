@@ -0,0 +1,23 @@
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # Windows 下没有 fcntl，只能依赖调用方的线程锁（单进程运行）
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path):
+    """跨进程的排他文件锁，多个 Web 进程读写同一份元数据时使用"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as f:
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)